@@ -1,28 +1,28 @@
-from machine import Pin, SPI
+from machine import Pin, SPI, Timer
 from ssd1306 import SSD1306_SPI
 import framebuf
 
+import assets
 
-NUMBER_BITS = [
-    bytearray.fromhex("3c3c66666E6E7676666666663C3C"),
-    bytearray.fromhex("1818181838381818181818187E7E"),
-    bytearray.fromhex("3C3C666606060C0C303060607E7E"),
-    bytearray.fromhex("3C3C666606063C3C060666663C3C"),
-    bytearray.fromhex("06060E0E1E1E66667F7F06060606"),
-    bytearray.fromhex("7E7E60607C7C0606060666663C3C"),
-    bytearray.fromhex("3C3C666660607C7C666666663C3C"),
-    bytearray.fromhex("7E7E66660E0E1818181818181818"),
-    bytearray.fromhex("3C3C666666663C3C666666663C3C"),
-    bytearray.fromhex("3C3C666666663E3E060666663C3C")
-]
 
-ICON_BITS = [
-    bytearray.fromhex("18247E4242817E18")
-]
+_CHAR_PITCH = 10
+_TILE_HEIGHT = 16
+_TILE_TEXT_Y = 7
 
 
 class Oled:
-    def __init__(self, sck, sda, res, dc ,cs, line=0, baudrate=100000, width=128, height=64):
+    """
+    SSD1306 SPI display with the clock's fonts and icons from the asset
+    pack, see assets.py.
+
+    With `double_buffer` set, show() only snapshots the frame and the pages
+    are sent one at a time from a timer every `flush_period` ms, keeping bus
+    time out of the input handlers that render.
+
+    Tall clock text is composited into framebuffer tiles kept in an LRU
+    cache of at most `tile_cache_size` entries, see tall_text().
+    """
+    def __init__(self, sck, sda, res, dc ,cs, line=0, baudrate=100000, width=128, height=64, double_buffer=False, flush_period=2, tile_cache_size=8):
 
         self.sck = Pin(sck) #Initalize as pin objects!
         self.sda = Pin(sda)
@@ -40,16 +40,132 @@ class Oled:
 
         self.oled.fill(0)
 
-        self._number_buf = [None]*10
-        for i in range(10):
-            self._number_buf[i] = framebuf.FrameBuffer(NUMBER_BITS[i], 8, 14, framebuf.MONO_HLSB)
+        self.double_buffer = double_buffer
+        self.flush_period = flush_period
+        self._flush_timer = Timer()
+        self._flushing = False
+
+        self.tile_cache_size = tile_cache_size
+        self._tiles = {}
+        self._tile_order = []
+        self.tile_hits = 0
+        self.tile_misses = 0
 
-        self._icon_buf = [None]*len(ICON_BITS)
-        for i in range(len(ICON_BITS)):
-            self._icon_buf[i] = framebuf.FrameBuffer(ICON_BITS[i], 8, 8, framebuf.MONO_HLSB)
+        self.assets = assets.AssetPack()
 
     def tall_digit(self, digit, x, y):
-        self.oled.blit(self._number_buf[digit], x, y)
+        self.oled.blit(self.assets.glyph(assets.FONT_TALL, ord("0") + digit), x, y)
+
+    def icon(self, icon, x, y):
+        """
+        Draw an 8x8 icon.
+        icon(int): One of the assets.ICON_* indices.
+        """
+        self.oled.blit(self.assets.glyph(assets.ICONS, icon), x, y)
 
     def bell(self, x, y):
-        self.oled.blit(self._icon_buf[0], x, y)
\ No newline at end of file
+        self.icon(assets.ICON_BELL, x, y)
+
+    def small_text(self, string, x, y):
+        """
+        Draw text with the 4x6 font. Characters missing from the font are
+        left blank.
+        """
+        width = self.assets.size(assets.FONT_SMALL)[0]
+        for k, char in enumerate(string):
+            code = ord(char)
+            if self.assets.has_glyph(assets.FONT_SMALL, code):
+                self.oled.blit(self.assets.glyph(assets.FONT_SMALL, code), x + width*k, y)
+
+    def tall_text(self, string, x, y):
+        """
+        Draw a clock string at (x, y) with tall digits, one character every
+        10 px. Each run of characters between ':' and ' ' separators is
+        blitted from a cached tile, so only runs whose value changed since
+        they were last drawn are composited again.
+
+        string(str): Text to draw, e.g. "12:34:56 pm".
+        x(int), y(int): Top left corner of the first character.
+        """
+        start = 0
+        length = len(string)
+
+        for end in range(length + 1):
+            if end < length and string[end] not in ": ":
+                continue
+
+            if end > start:
+                tile = self._tile(string[start:end])
+                self.oled.blit(tile, x + _CHAR_PITCH*start, y, 0)
+
+            if end < length and string[end] == ":":
+                self.oled.text(":", x + _CHAR_PITCH*end, y + _TILE_TEXT_Y)
+
+            start = end + 1
+
+    def _tile(self, key):
+        entry = self._tiles.get(key)
+        if entry is not None:
+            self.tile_hits += 1
+            if self._tile_order[-1] != key:
+                self._tile_order.remove(key)
+                self._tile_order.append(key)
+            return entry[0]
+
+        self.tile_misses += 1
+
+        # Evict the least recently used tile, reusing its buffer if the new
+        # tile has the same width.
+        entry = None
+        if len(self._tile_order) >= self.tile_cache_size:
+            old = self._tile_order.pop(0)
+            entry = self._tiles.pop(old)
+            if len(old) != len(key):
+                entry = None
+
+        if entry is None:
+            width = _CHAR_PITCH * len(key)
+            buf = bytearray(width * _TILE_HEIGHT // 8)
+            entry = (framebuf.FrameBuffer(buf, width, _TILE_HEIGHT, framebuf.MONO_VLSB), buf)
+
+        tile = entry[0]
+        tile.fill(0)
+        for k, char in enumerate(key):
+            if "0" <= char and char <= "9":
+                tile.blit(self.assets.glyph(assets.FONT_TALL, ord(char)), _CHAR_PITCH*k, 0)
+            else:
+                tile.text(char, _CHAR_PITCH*k, _TILE_TEXT_Y)
+
+        self._tiles[key] = entry
+        self._tile_order.append(key)
+        return tile
+
+    def show(self):
+        """
+        Send the frame buffer to the panel, or queue it for the incremental
+        flush in double-buffered mode.
+        """
+        if not self.double_buffer:
+            self.oled.show()
+            return
+
+        self.oled.present()
+
+        if not self._flushing:
+            self._flushing = True
+            self._flush_timer.init(
+                mode=Timer.PERIODIC,
+                period=self.flush_period,
+                callback=self._flush_handler
+            )
+
+    def frame_pending(self):
+        """
+        Return if a presented frame has not been fully sent yet.
+        """
+        return self.oled.frame_pending
+
+    def _flush_handler(self, timer):
+        if not self.oled.flush_step():
+            self._flush_timer.deinit()
+            self._flushing = False
@@ -1,24 +1,471 @@
+import _thread
+import math
 import utime
 
+from adc_capture import AdcCapture
+from array import array
+from capture_log import CaptureLog
 from clock_state import ClockState
+from clock_state import VER_ALARM
+from clock_state import VER_LEDS
+from clock_state import VER_RADIO
 from machine import Pin # REMINDER: DFT NOT DTFT!!!!
 from machine import ADC
 from neopixel import NeoPixel
-from ulab import numpy as np
+
+try:
+    from ulab import numpy as np
+except ImportError:
+    np = None # Only the "goertzel" engine works without ulab
+
+
+_MAGNITUDE_SCALE = 255
+_PHASE_SCALE = 50 # scalar
+_PHASE_STEPS = 64 # phase quantisation for the colour table
+_MIN_GOERTZEL_LENGTH = 8 # samples, for the widest Goertzel bands
+
+_IDLE_POLL_MS = 20 # how often a settled effect checks for a mode change
+_BREATHE_PERIOD_MS = 4000
+_ALARM_FLASH_MS = 250
+_ALARM_COLOUR = (255, 255, 255)
+
+_STATE_DEPENDS = (VER_LEDS, VER_RADIO, VER_ALARM)
+
+
+def spectrum(real, imaginary):
+    """
+    Return the (magnitudes, phases) of a spectrum as whole-array operations.
+    real(ndarray), imaginary(ndarray): Output of np.fft.fft.
+    """
+    magnitudes = np.sqrt(real*real + imaginary*imaginary)
+    phases = np.arctan2(imaginary, real)
+    return magnitudes, phases
+
+
+def band_edges(num_bins, num_bands, layout="linear"):
+    """
+    Split FFT bins 1 (skipping DC) to num_bins - 1 into num_bands bands.
+    Returns the num_bands + 1 bin indices where the bands start and end.
+
+    num_bins(int): Bins up to the Nyquist frequency.
+    num_bands(int): Number of bands, one per LED.
+    layout(str): "linear" for equal width bands, "log" for log-spaced ones.
+    """
+    span = num_bins - 1
+    edges = [1]
+
+    for n in range(1, num_bands + 1):
+        if layout == "log":
+            edge = int(round(math.exp(n * math.log(num_bins) / num_bands)))
+        else:
+            edge = 1 + n * span // num_bands
+
+        # every band gets at least one bin while there are bins left
+        edge = min(max(edge, edges[-1] + 1), num_bins)
+        edges.append(edge)
+
+    return edges
+
+
+def band_weights(edges, num_bins):
+    """
+    Return a (bands x num_bins) matrix that averages the bins of each band.
+    """
+    rows = []
+    for n in range(len(edges) - 1):
+        low, high = edges[n], edges[n + 1]
+        weight = 1 / (high - low) if high > low else 0
+        rows.append([weight if low <= k < high else 0 for k in range(num_bins)])
+
+    return np.array(rows, dtype=np.float)
+
+
+def window_values(size, kind="hann"):
+    """
+    Return a window of the given kind ("hann", "hamming" or None for a
+    rectangular one) as a list, normalised to a coherent gain of 1 so band
+    levels do not depend on the window.
+    """
+    if kind is None:
+        return [1.0] * size
+
+    a0 = 0.54 if kind == "hamming" else 0.5
+    window = [a0 - (1 - a0) * math.cos(n * 2 * math.pi / (size - 1)) for n in range(size)]
+    gain = size / sum(window)
+    return [value * gain for value in window]
+
+
+def window_response(window, offset):
+    """
+    Return the magnitude of a window's spectrum `offset` bins (of its own
+    length) from the centre.
+    """
+    step = 2 * math.pi * offset / len(window)
+    step_cos = math.cos(step)
+    step_sin = math.sin(step)
+    real = 0.0
+    imaginary = 0.0
+    c = 1.0
+    s = 0.0
+    for value in window:
+        real += value * c
+        imaginary += value * s
+        c, s = c * step_cos - s * step_sin, c * step_sin + s * step_cos
+    return math.sqrt(real * real + imaginary * imaginary)
+
+
+def window_table(size, kind="hann"):
+    """
+    Return window_values() as an ndarray.
+    """
+    return np.array(window_values(size, kind), dtype=np.float)
+
+
+def phase_colour_table(steps=_PHASE_STEPS):
+    """
+    Return a bytearray of `steps` (r, g, b) triples for phases from -pi to
+    pi. Phase 0 is cyan; towards -pi blue fades out then red fades in
+    (yellow), towards pi green fades out then red fades in (magenta).
+    """
+    table = bytearray(3 * steps)
+    for step in range(steps):
+        phase = 2 * (step + 0.5) / steps - 1 # in units of pi
+
+        if phase < -0.5:
+            r, g, b = -2*phase - 1, 1, 0 # Increase red
+        elif phase < 0:
+            r, g, b = 0, 1, 1 + 2*phase # Decrease blue
+        elif phase < 0.5:
+            r, g, b = 0, 1 - 2*phase, 1 # Decrease green
+        else:
+            r, g, b = 2*phase - 1, 0, 1 # Increase red
+
+        table[3*step] = int(255 * r + 0.5)
+        table[3*step + 1] = int(255 * g + 0.5)
+        table[3*step + 2] = int(255 * b + 0.5)
+
+    return table
+
+
+def gamma_table(gamma=2.2, brightness=1.0):
+    """
+    Return a 256 entry bytearray mapping linear levels to LED output, with
+    gamma correction and overall brightness applied.
+    """
+    table = bytearray(256)
+    for level in range(256):
+        table[level] = int(255 * brightness * (level / 255) ** gamma + 0.5)
+    return table
+
+
+class RealFFT(object):
+    """
+    FFT of real samples, computed as a size/2-point complex FFT of the even
+    and odd samples which is then split into the spectrum of the real input.
+    Returns bins 0 to size/2 - 1 in the preallocated `real` and `imaginary`
+    arrays, reused between frames. Only ulab's FFT itself still allocates.
+
+    size(int): Number of samples, a power of 2.
+    window(str): Window applied to the samples, see window_table().
+    """
+    def __init__(self, size, window="hann"):
+        self.size = size
+        half = size // 2
+
+        self.window = window_table(size, window)
+        self.samples = np.zeros(size, dtype=np.float)
+
+        k = np.arange(half, dtype=np.float) * (2 * np.pi / size)
+        self._cos = np.cos(k)
+        self._sin = np.sin(k)
+
+        self._even = np.zeros(half, dtype=np.float)
+        self._odd = np.zeros(half, dtype=np.float)
+        self._even_real = np.zeros(half, dtype=np.float)
+        self._even_imag = np.zeros(half, dtype=np.float)
+        self._odd_real = np.zeros(half, dtype=np.float)
+        self._odd_imag = np.zeros(half, dtype=np.float)
+        self._scratch = np.zeros(half, dtype=np.float)
+        self._scratch2 = np.zeros(half, dtype=np.float)
+
+        self.real = np.zeros(half, dtype=np.float)
+        self.imaginary = np.zeros(half, dtype=np.float)
+
+    def transform(self, samples):
+        """
+        Window `samples` (any array-like of `size` values, DC removed here)
+        and transform them. Returns (real, imaginary).
+        """
+        x = self.samples
+        x[:] = samples
+        x -= np.mean(x)
+        x *= self.window
+
+        self._even[:] = x[::2]
+        self._odd[:] = x[1::2]
+        zr, zi = np.fft.fft(self._even, self._odd)
+
+        # Z[N/2 - k], with Z[N/2] wrapping to Z[0]
+        rev_r = self._scratch
+        rev_i = self._scratch2
+        rev_r[0] = zr[0]
+        rev_r[1:] = zr[:0:-1]
+        rev_i[0] = zi[0]
+        rev_i[1:] = zi[:0:-1]
+
+        # E = (Z + conj(Z_rev)) / 2, O = (Z - conj(Z_rev)) / 2j
+        er = self._even_real
+        er[:] = zr
+        er += rev_r
+        er *= 0.5
+        ei = self._even_imag
+        ei[:] = zi
+        ei -= rev_i
+        ei *= 0.5
+        o_r = self._odd_real
+        o_r[:] = zi
+        o_r += rev_i
+        o_r *= 0.5
+        o_i = self._odd_imag
+        o_i[:] = rev_r
+        o_i -= zr
+        o_i *= 0.5
+
+        # X = E + W^k O, W^k = cos - j sin
+        real = self.real
+        real[:] = self._cos
+        real *= o_r
+        rev_r[:] = self._sin
+        rev_r *= o_i
+        real += rev_r
+        real += er
+
+        imaginary = self.imaginary
+        imaginary[:] = self._cos
+        imaginary *= o_i
+        rev_r[:] = self._sin
+        rev_r *= o_r
+        imaginary -= rev_r
+        imaginary += ei
+
+        return real, imaginary
+
+
+class GoertzelBank(object):
+    """
+    One Goertzel filter at the centre of each LED band, for when only a
+    handful of frequencies are needed rather than a full spectrum. Uses
+    `array` and `math` only, so it also runs on boards without ulab.
+
+    A filter over the whole frame would only pass a bin or two around the
+    centre. Each filter instead runs over the last `lengths[n]` samples of
+    the frame, windowed to that length, which widens its main lobe to the
+    band: neighbouring bands cross over at about half amplitude. Wide bands
+    need fewer samples, so a frame costs one pass per band over at most
+    `size` samples. Levels are scaled so a tone at a band centre reads the
+    same as the FFT engine's band average, and phases are referred to the
+    start of the frame like the FFT's.
+
+    size(int): Samples per frame.
+    edges(list): Band edges in bins, see band_edges().
+    window(str): Window applied to the samples, see window_values().
+    """
+    def __init__(self, size, edges, window="hann"):
+        self.size = size
+        self.num_bands = len(edges) - 1
+        self.centres = [(edges[n] + edges[n + 1] - 1) / 2 for n in range(self.num_bands)]
+
+        # main lobe half-width in bins: 1 rectangular, 2 for Hann and Hamming
+        lobe = 1 if window is None else 2
+        full_window = window_values(size, window)
+
+        self._x = array("f", bytes(4 * size))
+        self.lengths = array("H", bytes(2 * self.num_bands))
+        self._windows = []
+        self._scale = array("f", bytes(4 * self.num_bands))
+        self._coeff = array("f", bytes(4 * self.num_bands))
+        self._cos = array("f", bytes(4 * self.num_bands))
+        self._sin = array("f", bytes(4 * self.num_bands))
+        self._end_cos = array("f", bytes(4 * self.num_bands))
+        self._end_sin = array("f", bytes(4 * self.num_bands))
+
+        windows = {}
+        for n, centre in enumerate(self.centres):
+            width = edges[n + 1] - edges[n]
+            length = min(max(int(round(lobe * size / width)), _MIN_GOERTZEL_LENGTH), size)
+            if length not in windows:
+                windows[length] = array("f", window_values(length, window))
+            self.lengths[n] = length
+            self._windows.append(windows[length])
+
+            # the FFT engine averages the window's response over the band's
+            # bins, the filter sees the peak of its own: sum(window) = length
+            response = sum(window_response(full_window, k - centre) for k in range(edges[n], edges[n + 1]))
+            self._scale[n] = response / (width * length)
+
+            w = 2 * math.pi * centre / size
+            self._coeff[n] = 2 * math.cos(w)
+            self._cos[n] = math.cos(w)
+            self._sin[n] = math.sin(w)
+            # the recurrence leaves the result rotated by w*size (w*length,
+            # plus w*(size - length) for starting late), which is only a
+            # whole turn for centres on a bin
+            self._end_cos[n] = math.cos(w * size)
+            self._end_sin[n] = math.sin(w * size)
+
+        self.magnitudes = array("f", bytes(4 * self.num_bands))
+        self.phases = array("f", bytes(4 * self.num_bands))
+
+    def process(self, samples):
+        """
+        Filter one frame. Returns the (magnitudes, phases) arrays, one entry
+        per band, reused between frames.
+        samples(array): `size` raw readings.
+        """
+        x = self._x
+        mean = sum(samples) / self.size
+        for n in range(self.size):
+            x[n] = samples[n] - mean
+
+        for band in range(self.num_bands):
+            coeff = self._coeff[band]
+            window = self._windows[band]
+            start = self.size - self.lengths[band]
+            s1 = 0.0
+            s2 = 0.0
+            for n in range(self.lengths[band]):
+                s0 = x[start + n] * window[n] + coeff * s1 - s2
+                s2 = s1
+                s1 = s0
+
+            # y = s[L] - e^-jw s[L-1] with a zero input at n = L
+            s0 = coeff * s1 - s2
+            real = s0 - self._cos[band] * s1
+            imaginary = self._sin[band] * s1
+
+            # undo the e^jwN rotation
+            end_cos = self._end_cos[band]
+            end_sin = self._end_sin[band]
+            real, imaginary = real * end_cos + imaginary * end_sin, imaginary * end_cos - real * end_sin
+
+            self.magnitudes[band] = self._scale[band] * math.sqrt(real * real + imaginary * imaginary)
+            self.phases[band] = math.atan2(imaginary, real)
+
+        return self.magnitudes, self.phases
+
+
+class SpectrumBus(object):
+    """
+    Latest band levels from the visualiser, for other readers such as the
+    OLED spectrum screen. The visualiser publishes once per analysed frame;
+    readers compare `frame` with the value they last saw and only redraw
+    when it advanced.
+
+    num_bands(int): Number of bands, one per LED.
+    """
+    def __init__(self, num_bands):
+        self.levels = bytearray(num_bands) # 0 to 255 per band
+        self.frame = 0
+
+    def publish(self, levels):
+        """
+        levels(ndarray, bytearray): One 0 to 255 level per band.
+        """
+        for n in range(len(self.levels)):
+            self.levels[n] = levels[n]
+        self.frame += 1
+
+    def clear(self):
+        for n in range(len(self.levels)):
+            self.levels[n] = 0
+        self.frame += 1
+
+
+class LedCompositor(object):
+    """
+    Stages a whole LED frame in a bytearray and writes it to the strip in
+    one transfer. commit() skips the write when the frame is identical to
+    the last one written, and holds it back while writing would exceed
+    `max_fps`; a held back frame goes out on a later commit().
+
+    npleds(NeoPixel): Strip to write to.
+    max_fps(int): Maximum strip writes per second.
+    """
+    def __init__(self, npleds, max_fps=60):
+        self._np = npleds
+        self._bpp = npleds.bpp
+        self._order = npleds.ORDER
+        self.max_fps = max_fps
+
+        # staged and last written frames, in the strip's byte order
+        self.frame = bytearray(len(npleds.buf))
+        self._written = bytearray(len(npleds.buf))
+        self._last_write = utime.ticks_ms()
+        self._first = True
+
+        self.writes = 0
+        self.skipped = 0
+
+    def set(self, index, color):
+        """
+        Stage the colour of one LED.
+        color(tuple): (r, g, b), 0 to 255.
+        """
+        self.set_rgb(index, color[0], color[1], color[2])
+
+    def set_rgb(self, index, r, g, b):
+        offset = index * self._bpp
+        order = self._order
+        self.frame[offset + order[0]] = r
+        self.frame[offset + order[1]] = g
+        self.frame[offset + order[2]] = b
+
+    def fill(self, color):
+        """
+        Stage the same colour for every LED.
+        """
+        for index in range(len(self.frame) // self._bpp):
+            self.set(index, color)
+
+    def pending(self):
+        """
+        Return if the staged frame differs from the one on the strip.
+        """
+        return self._first or self.frame != self._written
+
+    def commit(self):
+        """
+        Write the staged frame to the strip if it changed and the frame rate
+        allows it. Returns True if the strip was written.
+        """
+        if not self.pending():
+            self.skipped += 1
+            return False
+
+        now = utime.ticks_ms()
+        if not self._first and utime.ticks_diff(now, self._last_write) < 1000 // self.max_fps:
+            return False
+
+        self._np.buf[:] = self.frame
+        self._np.write()
+        self._written[:] = self.frame
+        self._last_write = now
+        self._first = False
+        self.writes += 1
+        return True
 
 
 class LEDS():
 
-    def __init__(self, ADC_pin, GPIO_pin, num_leds, state, num_cycles = 128, sampling_period  = 48, save_data = False):
+    def __init__(self, ADC_pin, GPIO_pin, num_leds, state, num_cycles = 128, sampling_period  = 48, save_data = False, band_layout = "linear", window = "hann", max_fps = 60, gamma = 2.2, brightness = 1.0, engine = "fft"):
         
         self.ADC_pin = ADC_pin #28
         self.num_leds = num_leds
         self.clock_state = state
-        self.save_data = save_data
+        self.save_data = save_data # Log frames and spectra to flash, see capture_log
         self.sampling_period = sampling_period #Sampling rate fixed at 0.5MHz (2*10^-6s max) - Recorded in microseconds (48)
     
         self.num_cycles = num_cycles # Must be a power of 2
-        self.__save_data = save_data
         # self.skip_DC_component = True
         self.ADC_pin = Pin(ADC_pin)
         self.GPIO_pin = GPIO_pin # 8
@@ -26,144 +473,279 @@ class LEDS():
         # Definitions (Do not modify):
 
         self.npleds = NeoPixel(Pin(self.GPIO_pin), self.num_leds)
+        self.compositor = LedCompositor(self.npleds, max_fps)
+        self.spectrum = SpectrumBus(self.num_leds)
         self.analog_value = ADC(self.ADC_pin)
-        self.ADC_y = np.empty(self.num_cycles)
-        self.ADC_x = np.linspace(0, 3, self.num_cycles)
-        self.FFT_y = np.empty(self.num_cycles)
-        self.magnitudes = np.empty(self.num_cycles)
-        self.phases = np.empty(self.num_cycles)
-        self.average_magnitude = 0
-        self.average_phase = 0
-        self.frequency_samples = np.empty(self.num_cycles)
+
+        # Per-LED colour is looked up from these, see _render_bands
+        self.colour_table = phase_colour_table()
+        self.gamma_table = gamma_table(gamma, brightness)
+
+        # Bin-to-LED mapping: band n covers bins band_edges[n] to
+        # band_edges[n+1], band_weights averages them in one matrix product.
+        self.band_layout = band_layout # "linear" or "log"
+        self.band_edges = band_edges(self.num_cycles // 2, self.num_leds, band_layout)
+
+        # Analysis engine: "fft" transforms the whole frame with ulab and
+        # averages the bins of each band, "goertzel" only evaluates the band
+        # centres and is used whenever ulab is missing.
+        self.engine = engine if np is not None else "goertzel"
+        self.fft = None
+        self.goertzel = None
+        if self.engine == "goertzel":
+            self.goertzel = GoertzelBank(self.num_cycles, self.band_edges, window)
+            self.magnitudes = self.goertzel.magnitudes
+            self.phases = self.goertzel.phases
+            self._levels = bytearray(self.num_leds)
+            self._steps = bytearray(self.num_leds)
+        else:
+            self.ADC_y = np.zeros(self.num_cycles, dtype=np.float)
+            self.fft = RealFFT(self.num_cycles, window)
+            self.magnitudes = np.zeros(self.num_cycles // 2, dtype=np.float)
+            self.phases = np.zeros(self.num_cycles // 2, dtype=np.float)
+            self.band_weights = band_weights(self.band_edges, self.num_cycles // 2)
+
+        # Audio is captured by DMA from the free-running ADC, one frame per
+        # FFT. Without rp2.DMA it falls back to a timer interrupt limited to
+        # 8 kHz, see adc_capture.
+        adc_channel = ADC_pin - 26 if 26 <= ADC_pin <= 29 else None
+        self.capture = AdcCapture(self.analog_value, 1000000 // self.sampling_period, self.num_cycles, channel=adc_channel)
+
+        # Optional binary log of raw frames and their spectra
+        self.capture_log = CaptureLog() if save_data else None
+        self._raw_frame = array("H", bytes(2 * self.num_cycles))
+
+        # Bin (or band centre) frequencies, updated from the capture's sample rate
+        self.frequency_resolution = self.capture.rate / self.num_cycles
+        self.frequency_samples = self._frequencies(self.frequency_resolution)
+
+        # Copy of the ClockState fields the visualiser uses, see _sync_state
+        self.mode = "OFF"
+        self.color = (0, 0, 0)
+        self.audio_active = False
+        self.alarm_active = False
+        self._synced_version = -1
+
+        # Effect name: (step function, period in ms). An effect with a period
+        # of None is static, it is drawn once and then left alone until the
+        # mode or colour changes.
+        self.effects = {
+            "FFT" : (self._step_fft, 1),
+            "Set Colour" : (self._step_colour, None),
+            "OFF" : (self._step_off, None),
+            "Breathe" : (self._step_breathe, 40),
+            "Alarm" : (self._step_alarm, _ALARM_FLASH_MS)
+        }
+        self.effect = "OFF"
+        self._next_step = utime.ticks_ms()
+        self._settled = False
+        self._flash = False
+
+        self.running = False
+
+    def start(self):
+        """
+        Run the visualiser loop on the second core. The UI keeps running on
+        the first one; settings are picked up from the ClockState through
+        its lock. Audio frames come from the capture interrupt, which may
+        run on the other core, so they are only handed over through
+        AdcCapture.take() and release(), never by disabling interrupts.
+        """
+        if self.running:
+            return
+
+        self.running = True
+        _thread.start_new_thread(self._run, ())
+
+    def stop(self):
+        """
+        Stop the visualiser loop at the end of its current frame.
+        """
+        self.running = False
+
+    def _sync_state(self):
+        # Plain reads of the version counters are safe from either core; the
+        # lock is only taken when something changed.
+        state = self.clock_state
+        if state.version_sum(_STATE_DEPENDS) == self._synced_version:
+            return False
+
+        with state.lock:
+            self._synced_version = state.version_sum(_STATE_DEPENDS)
+            self.mode = state.get_led_mode()
+            self.color = state.led_color
+            self.audio_active = state.radio_enabled and not state.radio_muted
+            self.alarm_active = state.alarm_enabled and state.alarm_sounding()
+        return True
+
+    def _select_effect(self):
+        if self.alarm_active:
+            return "Alarm"
+        if self.mode == "FFT" and not self.audio_active:
+            return "OFF" # Due to noise, even if the radio is off, the ADC still reads values
+        if self.mode in self.effects:
+            return self.mode
+        return "OFF"
+
+    def step(self):
+        """
+        Run one step of the current effect if it is due. Mode changes from
+        the ClockState take effect on the next call.
+        Returns the milliseconds until step() should be called again.
+        """
+        if self._sync_state():
+            effect = self._select_effect()
+            if effect != "FFT" and self.effect == "FFT":
+                self.capture.stop()
+                self.spectrum.clear()
+            self.effect = effect
+            self._next_step = utime.ticks_ms()
+            self._settled = False
+
+        function, period = self.effects[self.effect]
+        if self._settled:
+            return _IDLE_POLL_MS
+
+        now = utime.ticks_ms()
+        wait = utime.ticks_diff(self._next_step, now)
+        if wait > 0:
+            return min(wait, _IDLE_POLL_MS)
+
+        function(now)
+
+        if period is None:
+            # Only come back if commit() held the frame back for max_fps
+            self._settled = not self.compositor.pending()
+            period = 1000 // self.compositor.max_fps
+
+        self._next_step = utime.ticks_add(now, period)
+        return min(period, _IDLE_POLL_MS)
+
+    def _step_off(self, now):
+        self.compositor.fill((0, 0, 0))
+        self.compositor.commit()
+
+    def _step_colour(self, now):
+        self.compositor.fill(self.color)
+        self.compositor.commit()
+
+    def _step_breathe(self, now):
+        # Triangle wave through the gamma table so the fade looks even
+        level = (now % _BREATHE_PERIOD_MS) * 510 // _BREATHE_PERIOD_MS
+        if level > 255:
+            level = 510 - level
+        level = self.gamma_table[level]
+
+        color = self.color
+        r = color[0] * level >> 8
+        g = color[1] * level >> 8
+        b = color[2] * level >> 8
+        for n in range(self.num_leds):
+            self.compositor.set_rgb(n, r, g, b)
+        self.compositor.commit()
+
+    def _step_alarm(self, now):
+        self._flash = not self._flash
+        self.compositor.fill(_ALARM_COLOUR if self._flash else (0, 0, 0))
+        self.compositor.commit()
+
+    def _step_fft(self, now):
+        self.capture.start()
+
+        frame = self.capture.take()
+        if frame is None:
+            return
+
+        self._raw_frame[:] = frame
+        sample_rate = self.capture.sample_rate() # of the taken frame, so before release()
+        self.capture.release()
+        self._update_frequencies(sample_rate)
+        self._process_frame(self._raw_frame)
+
+        if self.capture_log is not None:
+            self.capture_log.write(self._raw_frame, self.magnitudes, self.phases, sample_rate)
+
+    def _process_frame(self, samples):
+        """
+        Transform one frame of samples and show its spectrum on the strip.
+        samples(array): num_cycles raw ADC readings, array('H').
+        """
+        if self.goertzel is not None:
+            self.goertzel.process(samples)
+            self._render_levels(*self._quantise_bands(self.magnitudes, self.phases))
+            self.compositor.commit()
+            return
+
+        self.ADC_y[:] = np.frombuffer(samples, dtype=np.uint16)
+        self.real, self.imaginary = self.fft.transform(self.ADC_y)
+        self.magnitudes, self.phases = spectrum(self.real, self.imaginary)
+
+        band_magnitudes = np.dot(self.band_weights, self.magnitudes)
+        band_phases = np.dot(self.band_weights, self.phases)
+
+        self._render_bands(band_magnitudes, band_phases)
+        self.compositor.commit()
+
+    def _render_bands(self, band_magnitudes, band_phases):
+        # Quantise all bands at once, then each LED is three table lookups.
+        levels = np.clip(band_magnitudes * (1 / _MAGNITUDE_SCALE), 0, 255)
+        levels = np.array(levels, dtype=np.uint8)
+
+        steps = (band_phases * (1 / _PHASE_SCALE) + np.pi) * (_PHASE_STEPS / (2 * np.pi))
+        steps = np.array(np.clip(steps, 0, _PHASE_STEPS - 1), dtype=np.uint8)
+
+        self._render_levels(levels, steps)
+
+    def _quantise_bands(self, band_magnitudes, band_phases):
+        # Same quantisation as _render_bands, one band at a time
+        levels = self._levels
+        steps = self._steps
+        for n in range(self.num_leds):
+            level = int(band_magnitudes[n] * (1 / _MAGNITUDE_SCALE))
+            levels[n] = min(max(level, 0), 255)
+            step = int((band_phases[n] * (1 / _PHASE_SCALE) + math.pi) * (_PHASE_STEPS / (2 * math.pi)))
+            steps[n] = min(max(step, 0), _PHASE_STEPS - 1)
+        return levels, steps
+
+    def _render_levels(self, levels, steps):
+        self.spectrum.publish(levels)
+
+        colours = self.colour_table
+        gamma = self.gamma_table
+        for n in range(self.num_leds):
+            level = int(levels[n])
+            offset = 3 * int(steps[n])
+            self.compositor.set_rgb(
+                n,
+                gamma[colours[offset] * level >> 8],
+                gamma[colours[offset + 1] * level >> 8],
+                gamma[colours[offset + 2] * level >> 8]
+            )
+
+    def _update_frequencies(self, sample_rate):
+        resolution = sample_rate / self.num_cycles
+        if abs(resolution - self.frequency_resolution) > 0.01 * self.frequency_resolution:
+            self.frequency_resolution = resolution
+            self.frequency_samples = self._frequencies(resolution)
+
+    def _frequencies(self, resolution):
+        if self.goertzel is not None:
+            return [centre * resolution for centre in self.goertzel.centres]
+        return np.arange(self.num_cycles // 2, dtype=np.float) * resolution
         
     
     
-    def Constant(self, Off=False):
-        
-        for n in range(self.num_leds):
-            
-            if not Off:
-                self.npleds[n] =  (self.clock_state.led_color[0], self.clock_state.led_color[1], self.clock_state.led_color[2])
-               # print("here!")
-            else:
-                self.npleds[n] =  (0, 0, 0)
-            
-        self.npleds.write()
-            
     def FFT_State(self): #Handles all logic
+        """
+        Run the effects loop on the calling core, blocking until stop().
+        """
+        self.running = True
+        self._run()
 
-        while (True): #self.clock_state.led_states["FFT"]
-        #for i in range (1000):
-            
-            if(self.clock_state.radio_muted != False or self.clock_state.radio_enabled != True or self.clock_state.led_states["FFT"] != True): #Due to noise, even if the radio is off, the ADC still reads values
-                
-                if(self.clock_state.led_states["Set Colour"]):
-                    self.Constant(False)
-                    
-                else:
-                    self.Constant(True) # Assume "OFF" State
-                
-            
-
-            
-            else:
-                for i in range (self.num_cycles):
-                    
-                    self.digital_value = self.analog_value.read_u16()     
-                   # print("ADC: ", self.digital_value)
-                    
-                    self.ADC_y[i] = (self.digital_value)        
-                    utime.sleep_us(self.sampling_period) 
-
-                self.real, self.imaginary = np.fft.fft(self.ADC_y)
-                  
-                self.frequency_resolution = (1/(self.sampling_period*(10**-6))/(self.num_cycles))
-
-                for k in range(self.num_cycles):
-                
-                    self.magnitudes[k] = (np.sqrt((self.real[k]**2) + (self.imaginary[k]**2)))
-                
-                    self.phases[k] = (np.arctan2(self.imaginary[k], self.real[k]))
-                
-                    self.frequency_samples[k] = ((k)*self.frequency_resolution)
-                
-                #Bin 1: 1* numcycles/numleds
-                #Bin 16 (max num of leds): numleds * numcycles/numleds
-
-                self.counter = 0
-
-                self.led_def = np.array([0,1,1]) #Default led state, when phase = 0
-
-                for n in range (self.num_leds):
-                    
-                    start_time = utime.ticks_ms()
-                
-                    self.prev_counter = self.counter
-                    self.counter = n * self.num_cycles/self.num_leds
-                
-                    for q in range (self.prev_counter, self.counter): # Divide the frequencies into sections/a band
-                    
-                        self.q = int(q) # for some reason iterating between two numbers makes the iterator a float
-                    
-                        self.average_magnitude += self.magnitudes[self.q] # Take the average mangitude and phase of that frequency band (each led represents a frequency band)
-                        self.average_phase += self.phases[self.q]
-                        
-                    self.c = 50 # scalar 
-               
-                    self.num_bins_per_led = self.num_cycles // self.num_leds
-                    self.average_magnitude /= (self.num_bins_per_led * 255)
-                    self.average_phase /= self.num_bins_per_led * self.c
-
-                    self.linear_decrease = -(2/np.pi)*self.average_phase + 1
-                    self.linear_increase = (1/np.pi)*self.average_phase
-                    
-                    if(self.average_phase > np.pi):
-                        self.average_phase = np.pi
-                    elif(self.average_phase< -np.pi):
-                        self.average_phase = -np.pi #Only here because of scaling
-
-                    if self.average_phase >= -(np.pi / 2) and self.average_phase < 0:
-                        self.npleds[n] = tuple(map(int, np.ceil((self.led_def[0], self.led_def[1], (self.led_def[2] + self.linear_decrease) * self.average_magnitude))))  # Decrease blue
-                    
-                    elif self.average_phase >= -np.pi and self.average_phase < -(np.pi / 2):
-                        self.npleds[n] = tuple(map(int, np.ceil(((self.led_def[0] + self.linear_increase) * self.average_magnitude, self.led_def[1], self.led_def[2]))))  # Increase red
-                    
-                    elif self.average_phase >= 0 and self.average_phase < (np.pi / 2):
-                        self.npleds[n] = tuple(map(int, np.ceil((self.led_def[0], (self.led_def[1] + self.linear_decrease) * self.average_magnitude, self.led_def[2]))))  # Decrease green
-                    
-                    elif self.average_phase >= (np.pi / 2) and self.average_phase < np.pi:
-                        self.npleds[n] = tuple(map(int, np.ceil(((self.led_def[0] + self.linear_increase) * self.average_magnitude, self.led_def[1], self.led_def[2]))))  # Increase red
-                    
-                    #print(self.npleds[n][0], self.npleds[n][1], self.npleds[n][2])
-                    self.npleds.write()
-                
-                elapsed_time = utime.ticks_diff(utime.ticks_ms(), start_time)
-                if elapsed_time > 100:
-                    utime.sleep_ms(1)  # Yield control to allow interrupts
-                    
-            
-        if self.__save_data:
-            try:
-                self.f = open("ADC_DATA.txt", "wt")
-                
-                self.f.write("Original ADC values:\n")
-                self.f.write(', '.join(map(str, self.ADC_y)) + '\n')
-            
-                self.f.write("X values:\n")
-                self.f.write(', '.join(map(str, self.ADC_x)) + '\n')
-            
-                self.f.write("FFT Magnitudes:\n")
-                self.f.write(', '.join(map(str, self.magnitudes)) + '\n')
-                        
-                self.f.write("FFT Phases:\n")
-                self.f.write(', '.join(map(str, self.phases)) + '\n')
-            
-                self.f.write("Frequencies:\n")
-                self.f.write(', '.join(map(str, self.frequency_samples)) + '\n')
-
-                self.f.close()
-                
-            except Exception as e:
-                self.f.close() # Just in case...
-                raise RuntimeError("Could not write to file,", e)
-    
+    def _run(self):
+        while self.running:
+            utime.sleep_ms(self.step())
+
+        self.capture.stop()
+        if self.capture_log is not None:
+            self.capture_log.close()
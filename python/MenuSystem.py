@@ -1,10 +1,14 @@
+import time
+
 from machine import Timer
 
+import assets
 import clock_state
-import Leds_Handler
+import station_index
 
 
 _RESET_DELAY = 10000
+_MAX_FPS = 20
 _DEBUG = False
 
 def print_debug(*args, **kwds):
@@ -13,7 +17,19 @@ def print_debug(*args, **kwds):
 
 
 class MenuHandler: #keeping track of what is currently selected,
-    def __init__(self, encoder, accept_button, back_button, state, display, leds):
+    """
+    Routes input events to the current MenuItem and draws it.
+
+    Input events only mark the UI dirty with request_render(); the redraw is
+    done from a one-shot timer at most `max_fps` times a second, so a burst
+    of events between frames collapses into one redraw. Collapsed requests
+    are counted in `frames_coalesced`.
+
+    Unforced renders (the periodic tick) are skipped entirely when the state
+    versions the current item depends on have not changed since it was last
+    drawn. Skipped renders are counted in `frames_skipped`.
+    """
+    def __init__(self, encoder, accept_button, back_button, state, display, leds, max_fps=_MAX_FPS):
         self.state = state
         self.display = display
         self.root = None #This creates an attribute local to the instance. Self is automatically passed?
@@ -27,7 +43,16 @@ class MenuHandler: #keeping track of what is currently selected,
         back_button.set_press_fn(self._backpressed)
 
         self._reset_timer = Timer()
-        
+
+        self.max_fps = max_fps
+        self.frames_coalesced = 0
+        self.frames_skipped = 0
+        self._render_pending = False
+        self._render_force = False
+        self._rendered_item = None
+        self._rendered_version = -1
+        self._last_render = time.ticks_ms()
+        self._frame_timer = Timer()
 
     def __del__(self):
         pass
@@ -44,20 +69,60 @@ class MenuHandler: #keeping track of what is currently selected,
             return
 
         self._current = self.root
-        self.render()
+        self.request_render()
+
+    def request_render(self, force=True):
+        """
+        Mark the UI dirty and schedule a redraw for the next frame slot.
+        force(bool): Redraw even if no state the current item depends on
+            changed. Needed whenever the item's own state may have changed.
+        """
+        self._render_force = self._render_force or force
+
+        if self._render_pending:
+            self.frames_coalesced += 1
+            return
 
-    def render(self):
+        self._render_pending = True
+
+        elapsed = time.ticks_diff(time.ticks_ms(), self._last_render)
+        delay = 1000 // self.max_fps - elapsed
+        self._frame_timer.init(
+            mode=Timer.ONE_SHOT,
+            period=max(delay, 1),
+            callback=self._frame_handler
+        )
+
+    def _frame_handler(self, timer):
+        force = self._render_force
+        self._render_pending = False
+        self._render_force = False
+        self.render(force)
+
+    def render(self, force=True):
         if not self._current:
             return
 
+        # Checked before the skip below: the alarm can start from an unforced
+        # tick while showing an item that does not depend on VER_ALARM.
         if self.state.alarm_state in (clock_state._ALARM_SOUND, clock_state._ALARM_TEST):
             if not self.alarm_screen:
+                self._last_render = time.ticks_ms()
                 self.display.oled.fill(0)
                 self.display.oled.text("!! ALARM !!", 20, 28)
-                self.display.oled.show()
+                self.display.show()
                 self.alarm_screen = True
             return
 
+        version = self._current.version()
+        if (not force and not self.alarm_screen
+                and self._current is self._rendered_item
+                and version == self._rendered_version):
+            self.frames_skipped += 1
+            return
+
+        self._last_render = time.ticks_ms()
+
         self.display.oled.fill(0)
 
         if self._current != self.root:
@@ -67,10 +132,12 @@ class MenuHandler: #keeping track of what is currently selected,
             print_debug(self._current.name + " ", end="")
 
         self._current.render()
-        self.display.oled.show()
+        self.display.show()
         print_debug("")
 
         self.alarm_screen = False
+        self._rendered_item = self._current
+        self._rendered_version = version
 
     def _ccw_handler(self):
         if not self._current:
@@ -83,7 +150,7 @@ class MenuHandler: #keeping track of what is currently selected,
             return
 
         self._current.ccw()
-        self.render()
+        self.request_render()
 
     def _cw_handler(self):
         if not self._current:
@@ -96,7 +163,7 @@ class MenuHandler: #keeping track of what is currently selected,
             return
 
         self._current.cw()
-        self.render()
+        self.request_render()
 
     def _acceptpressed(self): ## _ thigns outside the class cant touch it __, no subclasses touching it
         if not self._current:
@@ -109,7 +176,7 @@ class MenuHandler: #keeping track of what is currently selected,
             return
 
         self._current.press()
-        self.render()
+        self.request_render()
 
     def _backpressed(self):
         if not self._current:
@@ -120,9 +187,12 @@ class MenuHandler: #keeping track of what is currently selected,
             return
 
         self._current.back()
-        self.render()
+        self.request_render()
 
 class MenuItem:
+    # clock_state.VER_* domains whose changes require a redraw of this item
+    depends = ()
+
     def __init__(self, parent, name, state, display, leds, handler=None):
         self.parent = parent #Attributes
         self.name = name
@@ -141,6 +211,12 @@ class MenuItem:
         node.parent = self
         return node #so you can actually do stuff with it (ex new = node.add_child(...))
 
+    def version(self):
+        """
+        Return a counter that advances whenever this item needs a redraw.
+        """
+        return self.state.version_sum(self.depends)
+
     def enter(self):
         pass
 
@@ -163,6 +239,8 @@ class MenuItem:
 
 
 class Functionality_ChangeRGB(MenuItem):
+    depends = (clock_state.VER_LEDS,)
+
     def __init__(self, parent, name, state, display, leds, handler):
         super().__init__(parent, name, state, display, leds, handler)
 
@@ -224,6 +302,7 @@ class Functionality_ChangeTimeFormat(MenuItem):
 
 
 class Functionality_FrequencyChange(MenuItem):
+    depends = (clock_state.VER_RADIO,)
 
     def __init__(self, parent, name, state, display, leds, handler):
         super().__init__(parent, name, state, display, leds, handler)
@@ -254,7 +333,115 @@ class Functionality_FrequencyChange(MenuItem):
         print_debug(message, end="")
 
 
+class Functionality_Seek(MenuItem):
+    depends = (clock_state.VER_RADIO,)
+
+    def cw(self):
+        self.state.seek_radio(True, self._seek_done)
+
+    def ccw(self):
+        self.state.seek_radio(False, self._seek_done)
+
+    def press(self):
+        if self.state.radio_seeking():
+            self.state.cancel_seek()
+        else:
+            self.cw()
+
+    def back(self):
+        if self.state.radio_seeking():
+            self.state.cancel_seek()
+        super().back()
+
+    def _seek_done(self):
+        self.handler.request_render(False)
+
+    def render(self):
+        if self.state.radio_seeking():
+            self.display.oled.text("Seeking...", 0, 36)
+        else:
+            self.display.oled.text("<{:03.1f}>".format(self.state.radio_freq), 0, 36)
+            self.display.oled.text("str {}".format(self.state.radio_rssi), 0, 46)
+
+        print_debug("Seek: {:03.1f} ".format(self.state.radio_freq), end="")
+
+
+class Functionality_StationSelect(MenuItem):
+    depends = (clock_state.VER_RADIO,)
+
+    def cw(self):
+        self.state.next_station(1)
+
+    def ccw(self):
+        self.state.next_station(-1)
+
+    def render(self):
+        index = self.state.station_index
+        if not index.count:
+            self.display.oled.text("No stations,", 0, 36)
+            self.display.oled.text("run Scan", 0, 46)
+            return
+
+        self.display.oled.text("<{:03.1f}> {}".format(
+            self.state.radio_freq, self.state.get_station_name()), 0, 36)
+
+        station = index.find(self.state.radio_freq)
+        if station >= 0:
+            self.display.oled.text("{}/{} rssi {}".format(
+                station + 1, index.count, index.rssi[station]), 0, 46)
+
+        print_debug("Station: {:03.1f} ".format(self.state.radio_freq), end="")
+
+
+class Functionality_Scan(MenuItem):
+    """
+    Starts or cancels the background band scan. While the scan runs, the
+    screen follows its progress; leaving the screen does not stop it.
+    """
+    depends = (clock_state.VER_RADIO,)
+
+    def __init__(self, parent, name, state, display, leds, handler):
+        super().__init__(parent, name, state, display, leds, handler)
+
+        self._timer = Timer()
+
+    def version(self):
+        return super().version() + self.state.band_scan.channel
+
+    def press(self):
+        if self.state.scanning():
+            self.state.cancel_scan()
+            return
+
+        self.state.scan_stations(self._scan_done)
+        self._timer.init(
+            mode=Timer.PERIODIC,
+            period=250,
+            callback=self._timer_handler
+        )
+
+    def _scan_done(self):
+        self._timer.deinit()
+        if self.handler._current is self:
+            self.handler.request_render(False)
+
+    def _timer_handler(self, timer):
+        if self.handler._current is self:
+            self.handler.request_render(False)
+
+    def render(self):
+        scan = self.state.band_scan
+        if scan.running:
+            self.display.oled.text("Scanning {:03.1f}".format(
+                station_index.frequency(scan.channel)), 0, 36)
+        else:
+            self.display.oled.text("Press to scan", 0, 36)
+        self.display.oled.text("{} stations".format(self.state.station_index.count), 0, 46)
+
+
 class Functionality_AlarmTime(MenuItem):
+    depends = (clock_state.VER_ALARM,)
+
     def __init__(self, parent, name, state, display, leds, handler):
         super().__init__(parent, name, state, display, leds, handler)
 
@@ -472,6 +659,8 @@ class Functionality_Roller(MenuItem):
 
 
 class Functionality_AlarmPattern(Functionality_Roller):
+    depends = (clock_state.VER_ALARM,)
+
     def __init__(self, parent, name, state, display, leds, handler):
         super().__init__(parent, name, state, display, leds, handler)
         self.alarm_state = clock_state._ALARM_OFF
@@ -551,6 +740,13 @@ class Functionality_MenuSelect(MenuItem): #Draw '<' "Item" '>'
 
 
 class Functionality_ClockDisplay(Functionality_MenuSelect):
+    depends = (
+        clock_state.VER_TIME,
+        clock_state.VER_ALARM,
+        clock_state.VER_RADIO,
+        clock_state.VER_TEMP
+    )
+
     def render(self):
         tstring, dstring = self.state.get_clock_string()
         self.display.oled.text(self.state.get_temp_string(), 0, 0)
@@ -559,23 +755,27 @@ class Functionality_ClockDisplay(Functionality_MenuSelect):
         if self.state.tz_offset:
             self.display.oled.text("UTC{:+d}".format(self.state.tz_offset), 64, 9)
 
-        if self.state.alarm_enabled:
+        if self.state.alarm_state == clock_state._ALARM_SNOOZE:
+            self.display.icon(assets.ICON_ALARM, 120, 9)
+        elif self.state.alarm_enabled:
             self.display.bell(120, 9)
 
-        for k, char in enumerate(tstring):
-            if "0" <= char and char <= "9":
-                self.display.tall_digit(ord(char) - ord("0"), 8+10*k, 24)
-            else:
-                self.display.oled.text(char, 8+10*k, 31)
+        self.display.tall_text(tstring, 8, 24)
 
         if self.state.radio_enabled:
             freq = self.state.radio_freq
-            channel_name = self.state.stations.get(self.state.radio_freq, "")
-            self.display.oled.text("{:.1f} {}".format(freq, channel_name), 0, 47)
-
-            volume = int(10 * self.state.radio_volume / 15)
-            strength = int(10 * self.state.radio.get_signal_strength() / 7)
-            self.display.oled.text("vol {:<2d} str {:<2d}".format(volume, strength), 0, 56)
+            channel_name = self.state.get_station_name()
+            self.display.icon(assets.ICON_RADIO, 0, 47)
+            self.display.oled.text("{:.1f} {}".format(freq, channel_name), 10, 47)
+
+            # signal bars, then the volume or the mute icon
+            bars = int(4 * self.state.radio.get_signal_strength() / 7 + 0.5)
+            self.display.icon(assets.ICON_SIGNAL + bars, 0, 56)
+            if self.state.radio_muted:
+                self.display.icon(assets.ICON_MUTE, 10, 56)
+            else:
+                volume = int(10 * self.state.radio_volume / 15)
+                self.display.small_text("{:d}".format(volume), 10, 57)
 
         print_debug(tstring, end="")
 
@@ -586,16 +786,13 @@ class Functionality_ClockDisplay(Functionality_MenuSelect):
         self.press()
 
 class Functionality_Change_Lighting(MenuItem):
+    depends = (clock_state.VER_LEDS,)
+
     def __init__(self, parent, name, state, display, leds, handler):
         super().__init__(parent, name, state, display, leds, handler)
                 
     def press(self):
-        
-        for item in self.state.led_states:
-            if item != self.name:
-                self.state.led_states[item] = False
-            else:
-                self.state.led_states[item] = not self.state.led_states[item]
+        self.state.set_led_mode(self.name)
             
     def ccw(self):
         self.press()
@@ -605,4 +802,48 @@ class Functionality_Change_Lighting(MenuItem):
 
     def render(self):
         #print(self.values_list[0])
-        self.display.oled.text('<' + str(self.state.led_states[self.name]) + '>', 0, 36)
\ No newline at end of file
+        self.display.oled.text('<' + str(self.state.led_states[self.name]) + '>', 0, 36)
+
+
+class Functionality_Spectrum(MenuItem):
+    """
+    Bar graph of the LED visualiser's band levels, read from leds.spectrum.
+    While shown, a timer asks for a redraw at the menu frame rate; the
+    handler skips it unless the visualiser published a new frame.
+    """
+    def __init__(self, parent, name, state, display, leds, handler):
+        super().__init__(parent, name, state, display, leds, handler)
+
+        self._timer = Timer()
+
+    def version(self):
+        return super().version() + self.leds.spectrum.frame
+
+    def enter(self):
+        self.handler.pause_reset_timer = True
+        self._timer.init(
+            mode=Timer.PERIODIC,
+            period=1000 // self.handler.max_fps,
+            callback=self._timer_handler
+        )
+
+    def _timer_handler(self, timer):
+        if self.handler._current is not self:
+            timer.deinit()
+            return
+        self.handler.request_render(False)
+
+    def back(self):
+        self._timer.deinit()
+        self.handler.pause_reset_timer = False
+        super().back()
+
+    def render(self):
+        levels = self.leds.spectrum.levels
+        width = 128 // len(levels)
+        for n in range(len(levels)):
+            height = levels[n] * 42 // 255
+            if height:
+                self.display.oled.fill_rect(n * width, 64 - height, width - 2, height, 1)
+
+        print_debug(" ".join(str(level) for level in levels), end="")
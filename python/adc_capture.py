@@ -0,0 +1,250 @@
+from array import array
+
+import machine
+import utime
+
+from machine import Timer
+
+try:
+    from rp2 import DMA
+except (ImportError, AttributeError):
+    DMA = None # MicroPython before 1.21, or the host
+
+
+# Frame sequence numbers wrap at num_frames * _SEQUENCE_TURNS, so they stay
+# small ints and the interrupt never allocates.
+_SEQUENCE_TURNS = 4096
+
+# RP2040 ADC registers, see the datasheet section 4.9.6
+_ADC_BASE = 0x4004C000
+_ADC_CS = _ADC_BASE + 0x00
+_ADC_FCS = _ADC_BASE + 0x08
+_ADC_FIFO = _ADC_BASE + 0x0C
+_ADC_DIV = _ADC_BASE + 0x10
+
+_CS_EN = 1 << 0
+_CS_START_MANY = 1 << 3
+_CS_AINSEL_SHIFT = 12
+_FCS_EN = 1 << 0
+_FCS_DREQ_EN = 1 << 3
+_FCS_UNDER = 1 << 10
+_FCS_OVER = 1 << 11
+_FCS_LEVEL_SHIFT = 16
+_FCS_THRESH_SHIFT = 24
+
+_ADC_CLOCK = 48000000
+_DREQ_ADC = 36
+_DMA_SIZE_16 = 1
+
+# Highest rate the timer fallback is run at. Each sample costs a Python
+# hard interrupt of roughly 20 to 30 us on a Cortex-M0+, so faster rates
+# leave the core little else to do.
+_MAX_ISR_RATE = 8000
+
+
+class AdcCapture(object):
+    """
+    Samples an ADC at a fixed rate into a ring of preallocated frames, so
+    the consumer never busy-waits on the ADC and interpreter/GC pauses do
+    not skew the sample rate.
+
+    When rp2.DMA is available (MicroPython 1.21 on) and `channel` is
+    given, the ADC free-runs, paced by its own clock divider, and a DMA
+    channel moves the results from its FIFO into the current frame. Python
+    only runs once per frame, from the DMA completion interrupt, to pick
+    the next frame and restart the transfer. Otherwise each sample is read
+    from a hard timer interrupt, which costs too much CPU for fast rates,
+    so that fallback is limited to _MAX_ISR_RATE.
+
+    The consumer calls take() to get the newest complete frame (or None)
+    and release() once it is done with it. The interrupt and the consumer
+    may run on different cores, where disabling interrupts does not
+    exclude the other side, so the ring is handed over by sequence numbers
+    with a single writer each: only the interrupt advances the count of
+    captured frames, only the consumer the count of released ones. When
+    the consumer falls behind, the interrupt refills the frame it just
+    captured rather than touch an unreleased one (counted in `overruns`),
+    and take() skips to the newest frame (counted in `frames_skipped`).
+
+    While DMA capture runs, the ADC input is reselected at every frame, so
+    a read_u16() on another channel, e.g. the core temperature from
+    ClockState, may put a few foreign samples in the current frame.
+
+    adc(machine.ADC): ADC to sample, also sets up the pin as an analog input.
+    rate(int): Sample rate in Hz.
+    frame_size(int): Samples per frame.
+    num_frames(int): Frames in the ring, at least 2.
+    channel(int): ADC input of `adc` (0 to 3 for GPIO 26 to 29), None to
+        always use the timer.
+    """
+    def __init__(self, adc, rate, frame_size, num_frames=3, channel=None):
+        self._adc = adc
+        self.frame_size = frame_size
+        self.num_frames = max(num_frames, 2)
+
+        self._dma = DMA() if DMA is not None and channel is not None else None
+        if self._dma is not None:
+            # ADC clock divider, the ADC converts every 1 + div cycles of 48 MHz
+            div = max(int(_ADC_CLOCK * 256 / rate) - 256, 0)
+            self._div = div
+            self.rate = _ADC_CLOCK * 256 / (256 + div)
+            self._cs = _CS_EN | (channel << _CS_AINSEL_SHIFT) | _CS_START_MANY
+            self._ctrl = self._dma.pack_ctrl(
+                size=_DMA_SIZE_16, inc_read=False, inc_write=True, treq_sel=_DREQ_ADC)
+        else:
+            self.rate = min(rate, _MAX_ISR_RATE)
+            self._timer = Timer()
+
+        self._frames = [array("H", bytes(2 * frame_size)) for _ in range(self.num_frames)]
+        self._wrap = self.num_frames * _SEQUENCE_TURNS
+        self._write = 0 # frame being filled, written by the interrupt only
+        self._captured = 0 # sequence number of the frame being filled, interrupt only
+        self._released = 0 # oldest frame not released yet, consumer only
+        self._taken = -1 # sequence number of the frame handed out, consumer only
+        self._pos = 0
+
+        self._frame_start = 0
+        self._frame_us = 0
+        self.frames_captured = 0
+        self.overruns = 0 # written by the interrupt only
+        self.frames_skipped = 0 # written by the consumer only
+
+        self.running = False
+
+    def start(self):
+        """
+        Start sampling. Frames captured before a stop() are discarded.
+        """
+        if self.running:
+            return
+
+        self._write = 0
+        self._captured = 0
+        self._released = 0
+        self._taken = -1
+        self._pos = 0
+
+        self._frame_start = utime.ticks_us()
+        if self._dma is not None:
+            self._start_dma()
+        else:
+            self._timer.init(
+                mode=Timer.PERIODIC,
+                freq=self.rate,
+                callback=self._sample_handler,
+                hard=True
+            )
+        self.running = True
+
+    def stop(self):
+        if self._dma is not None:
+            mem32 = machine.mem32
+            mem32[_ADC_CS] = _CS_EN
+            self._dma.irq(None)
+            self._dma.active(0)
+            mem32[_ADC_FCS] = 0
+            self._drain_fifo()
+        else:
+            self._timer.deinit()
+        self.running = False
+
+    def _start_dma(self):
+        mem32 = machine.mem32
+        mem32[_ADC_CS] = _CS_EN
+        mem32[_ADC_DIV] = self._div
+        mem32[_ADC_FCS] = _FCS_EN | _FCS_DREQ_EN | (1 << _FCS_THRESH_SHIFT)
+        self._drain_fifo()
+        mem32[_ADC_FCS] |= _FCS_UNDER | _FCS_OVER # write 1 to clear
+
+        self._dma.irq(self._dma_handler, hard=True)
+        self._restart_dma()
+        mem32[_ADC_CS] = self._cs
+
+    def _drain_fifo(self):
+        mem32 = machine.mem32
+        while (mem32[_ADC_FCS] >> _FCS_LEVEL_SHIFT) & 0xf:
+            mem32[_ADC_FIFO]
+
+    def _restart_dma(self):
+        self._dma.config(
+            read=_ADC_FIFO,
+            write=self._frames[self._write],
+            count=self.frame_size,
+            ctrl=self._ctrl,
+            trigger=True
+        )
+
+    def _dma_handler(self, dma):
+        # Runs as a hard interrupt: must not allocate. The ADC FIFO holds
+        # four samples, so the next transfer has to start within four
+        # sample periods.
+        self._frame_done()
+        self._restart_dma()
+        machine.mem32[_ADC_CS] = self._cs # undo any read_u16() on another input
+
+    def _sample_handler(self, timer):
+        # Runs as a hard interrupt: must not allocate.
+        self._frames[self._write][self._pos] = self._adc.read_u16()
+        self._pos += 1
+        if self._pos < self.frame_size:
+            return
+
+        self._pos = 0
+        self._frame_done()
+
+    def _frame_done(self):
+        now = utime.ticks_us()
+        self._frame_us = utime.ticks_diff(now, self._frame_start)
+        self._frame_start = now
+        self.frames_captured = (self.frames_captured + 1) & 0x3fffffff
+
+        following = (self._captured + 1) % self._wrap
+        if (following - self._released) % self._wrap >= self.num_frames:
+            # Every other frame is unreleased, refill the current one.
+            self.overruns += 1
+            return
+
+        # Publishes the frame just filled to take()
+        self._captured = following
+        self._write = following % self.num_frames
+
+    def take(self):
+        """
+        Return the newest complete frame as an array('H') scaled like
+        ADC.read_u16(), or None if there is none yet. The frame stays valid
+        until release() is called.
+        """
+        captured = self._captured
+        if self._taken >= 0 or captured == self._released:
+            return None
+
+        newest = (captured - 1) % self._wrap
+        self.frames_skipped += (newest - self._released) % self._wrap
+        self._taken = newest
+
+        frame = self._frames[newest % self.num_frames]
+        if self._dma is not None:
+            # 12-bit FIFO results, scaled to 16 bits as read_u16() does
+            for i in range(self.frame_size):
+                value = frame[i] & 0xfff
+                frame[i] = (value << 4) | (value >> 8)
+        return frame
+
+    def release(self):
+        """
+        Hand the frame returned by take() back to the capture.
+        """
+        if self._taken >= 0:
+            # Frees the taken frame and any skipped before it
+            self._released = (self._taken + 1) % self._wrap
+            self._taken = -1
+
+    def sample_rate(self):
+        """
+        Return the sample rate in Hz: that of the ADC divider with DMA,
+        otherwise the one measured over the last complete frame, or the
+        requested rate if no frame was completed yet.
+        """
+        if self._dma is not None or not self._frame_us:
+            return self.rate
+        return self.frame_size * 1000000 / self._frame_us
@@ -0,0 +1,22 @@
+# Generated by host/make_assets.py, do not edit.
+ASSETS = (
+    b"\x43\x52\x41\x01\x03\x08\x0e\x30\x0a\x17\x00\x04\x06\x30\x0a\xa3"
+    b"\x00\x08\x08\x00\x09\xdf\x00\x3c\x3c\x66\x66\x6e\x6e\x76\x76\x66"
+    b"\x66\x66\x66\x3c\x3c\x18\x18\x18\x18\x38\x38\x18\x18\x18\x18\x18"
+    b"\x18\x7e\x7e\x3c\x3c\x66\x66\x06\x06\x0c\x0c\x30\x30\x60\x60\x7e"
+    b"\x7e\x3c\x3c\x66\x66\x06\x06\x3c\x3c\x06\x06\x66\x66\x3c\x3c\x06"
+    b"\x06\x0e\x0e\x1e\x1e\x66\x66\x7f\x7f\x06\x06\x06\x06\x7e\x7e\x60"
+    b"\x60\x7c\x7c\x06\x06\x06\x06\x66\x66\x3c\x3c\x3c\x3c\x66\x66\x60"
+    b"\x60\x7c\x7c\x66\x66\x66\x66\x3c\x3c\x7e\x7e\x66\x66\x0e\x0e\x18"
+    b"\x18\x18\x18\x18\x18\x18\x18\x3c\x3c\x66\x66\x66\x66\x3c\x3c\x66"
+    b"\x66\x66\x66\x3c\x3c\x3c\x3c\x66\x66\x66\x66\x3e\x3e\x06\x06\x66"
+    b"\x66\x3c\x3c\xe0\xa0\xa0\xa0\xe0\x00\x40\xc0\x40\x40\xe0\x00\xe0"
+    b"\x20\xe0\x80\xe0\x00\xe0\x20\xe0\x20\xe0\x00\xa0\xa0\xe0\x20\x20"
+    b"\x00\xe0\x80\xe0\x20\xe0\x00\xe0\x80\xe0\xa0\xe0\x00\xe0\x20\x20"
+    b"\x40\x40\x00\xe0\xa0\xe0\xa0\xe0\x00\xe0\xa0\xe0\x20\xe0\x00\x18"
+    b"\x24\x7e\x42\x42\x81\x7e\x18\x3c\x42\x91\x91\x9d\x81\x42\x3c\x04"
+    b"\x08\xff\x81\xb5\xb5\x81\xff\x10\x30\xf5\xf2\xf5\x30\x10\x00\x00"
+    b"\x00\x00\x00\x00\x00\x00\xaa\x00\x00\x00\x00\x00\x00\x80\xaa\x00"
+    b"\x00\x00\x00\x20\x20\xa0\xaa\x00\x00\x08\x08\x28\x28\xa8\xaa\x02"
+    b"\x02\x0a\x0a\x2a\x2a\xaa\xaa"
+)
@@ -0,0 +1,88 @@
+import framebuf
+
+from asset_data import ASSETS
+
+
+# Glyph sets in the asset pack
+FONT_TALL = 0
+FONT_SMALL = 1
+ICONS = 2
+
+# Glyphs of the ICONS set
+ICON_BELL = 0
+ICON_ALARM = 1
+ICON_RADIO = 2
+ICON_MUTE = 3
+ICON_SIGNAL = 4 # + level, 0 to 4
+
+_VERSION = 1 # format version in the header, see host/make_assets.py
+_HEADER_SIZE = 5
+_SET_ENTRY_SIZE = 6
+
+
+class AssetPack(object):
+    """
+    Fonts and icons packed in a single bytes blob (see host/make_assets.py).
+
+    Layout, little-endian: b"CRA", format version, number of glyph sets,
+    then per set a 6-byte entry (width, height, code of the first glyph,
+    glyph count, u16 offset of the glyph data). Glyph data is MONO_HLSB.
+
+    Glyphs are read through memoryview slices of the blob and only copied
+    into a FrameBuffer the first time they are used.
+
+    blob(bytes): Packed assets, defaults to asset_data.ASSETS.
+    """
+    def __init__(self, blob=ASSETS):
+        if blob[:3] != b"CRA":
+            raise ValueError("not an asset pack")
+        if blob[3] != _VERSION:
+            raise ValueError("asset pack version {}, expected {}".format(blob[3], _VERSION))
+
+        self._blob = memoryview(blob)
+        self._num_sets = blob[4]
+        self._glyphs = {}
+
+    def size(self, glyph_set):
+        """
+        Return the (width, height) of the glyphs in a set.
+        """
+        entry = _HEADER_SIZE + _SET_ENTRY_SIZE * glyph_set
+        return self._blob[entry], self._blob[entry + 1]
+
+    def has_glyph(self, glyph_set, code):
+        """
+        Return if the set has a glyph for the given character code or index.
+        """
+        entry = _HEADER_SIZE + _SET_ENTRY_SIZE * glyph_set
+        index = code - self._blob[entry + 2]
+        return 0 <= index < self._blob[entry + 3]
+
+    def glyph(self, glyph_set, code):
+        """
+        Return the FrameBuffer for a glyph, creating it on first use.
+
+        glyph_set(int): FONT_* or ICONS.
+        code(int): Character code for fonts, ICON_* index for icons.
+        """
+        key = glyph_set << 8 | code
+        fbuf = self._glyphs.get(key)
+        if fbuf is not None:
+            return fbuf
+
+        if not 0 <= glyph_set < self._num_sets or not self.has_glyph(glyph_set, code):
+            raise ValueError("no such glyph")
+
+        blob = self._blob
+        entry = _HEADER_SIZE + _SET_ENTRY_SIZE * glyph_set
+        width = blob[entry]
+        height = blob[entry + 1]
+        offset = blob[entry + 4] | blob[entry + 5] << 8
+        size = (width + 7) // 8 * height
+        start = offset + (code - blob[entry + 2]) * size
+
+        # FrameBuffer needs a writable buffer, so the glyph is copied here.
+        buf = bytearray(blob[start:start + size])
+        fbuf = framebuf.FrameBuffer(buf, width, height, framebuf.MONO_HLSB)
+        self._glyphs[key] = fbuf
+        return fbuf
@@ -0,0 +1,114 @@
+"""
+Microbenchmark for the LED visualiser's FFT stage: FFT plus magnitude/phase
+per frame, computed with the old per-bin interpreted loop and with the
+whole-array version in Leds_Handler.spectrum(). Reports frames per second for
+64, 128 and 256-point frames.
+
+Then compares the two LED analysis engines for an 8-LED strip: the real FFT
+reduced to bands, and the Goertzel bank evaluating one filter per band centre.
+Reports the CPU time per LED update (one frame in, 8 band levels out).
+
+Without ulab only the Goertzel engine is timed.
+
+Run on the board (or on the host with `python3 host/run.py bench_fft.py`).
+"""
+import math
+import utime
+
+from array import array
+
+try:
+    from ulab import numpy as np
+except ImportError:
+    np = None # Only the Goertzel engine is benchmarked without ulab
+
+from Leds_Handler import GoertzelBank
+from Leds_Handler import RealFFT
+from Leds_Handler import band_edges
+from Leds_Handler import band_weights
+from Leds_Handler import spectrum
+
+
+_SIZES = (64, 128, 256)
+_FRAMES = 20
+_LEDS = 8
+
+
+def per_bin_loop(samples):
+    real, imaginary = np.fft.fft(samples)
+    magnitudes = np.empty(len(samples))
+    phases = np.empty(len(samples))
+
+    for k in range(len(samples)):
+        magnitudes[k] = (np.sqrt((real[k]**2) + (imaginary[k]**2)))
+        phases[k] = (np.arctan2(imaginary[k], real[k]))
+
+    return magnitudes, phases
+
+
+def vectorised(samples):
+    real, imaginary = np.fft.fft(samples)
+    return spectrum(real, imaginary)
+
+
+def frames_per_second(fn, samples):
+    start = utime.ticks_us()
+    for _ in range(_FRAMES):
+        fn(samples)
+    elapsed = utime.ticks_diff(utime.ticks_us(), start)
+    return _FRAMES * 1000000 / max(elapsed, 1)
+
+
+def update_us(fn, samples):
+    start = utime.ticks_us()
+    for _ in range(_FRAMES):
+        fn(samples)
+    return utime.ticks_diff(utime.ticks_us(), start) / _FRAMES
+
+
+def compare_engines(size):
+    """
+    Return the time per LED update of the FFT engine (None without ulab)
+    and of the Goertzel engine, in microseconds.
+    """
+    edges = band_edges(size // 2, _LEDS)
+    goertzel = GoertzelBank(size, edges)
+    raw = array("H", [int(32768 + 20000 * math.sin(n * 16 * math.pi / size)) for n in range(size)])
+    if np is None:
+        return None, update_us(goertzel.process, raw)
+
+    weights = band_weights(edges, size // 2)
+    fft = RealFFT(size)
+    y = np.zeros(size, dtype=np.float)
+
+    def fft_update(raw):
+        y[:] = np.frombuffer(raw, dtype=np.uint16)
+        magnitudes, phases = spectrum(*fft.transform(y))
+        return np.dot(weights, magnitudes), np.dot(weights, phases)
+
+    return update_us(fft_update, raw), update_us(goertzel.process, raw)
+
+
+def main():
+    if np is not None:
+        print("{:>6} {:>12} {:>12} {:>8}".format("points", "loop fps", "array fps", "speedup"))
+        for size in _SIZES:
+            samples = np.sin(np.linspace(0, 16 * np.pi, size)) * 20000 + 32768
+            before = frames_per_second(per_bin_loop, samples)
+            after = frames_per_second(vectorised, samples)
+            print("{:>6d} {:>12.1f} {:>12.1f} {:>7.1f}x".format(size, before, after, after / before))
+        print()
+    else:
+        print("ulab not available, timing the Goertzel engine only")
+        print()
+
+    print("{} LEDs, CPU time per LED update".format(_LEDS))
+    print("{:>6} {:>12} {:>12}".format("points", "fft us", "goertzel us"))
+    for size in _SIZES:
+        fft_us, goertzel_us = compare_engines(size)
+        fft_column = "-" if fft_us is None else "{:.0f}".format(fft_us)
+        print("{:>6d} {:>12} {:>12.0f}".format(size, fft_column, goertzel_us))
+
+
+if __name__ == "__main__":
+    main()
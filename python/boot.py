@@ -13,28 +13,29 @@ from Leds_Handler import LEDS
 encoder = RotaryEncoder(3, 4)
 accept_button = PushButton(5)
 back_button = PushButton(10)
-display = Oled(18, 19, 21, 20, 17)
+display = Oled(18, 19, 21, 20, 17, double_buffer=True)
 
 
 state = clock_state.ClockState()
 
-leds = LEDS(28, 8, 8, state)
+# save_data logs visualiser frames to flash, only for debugging
+leds = LEDS(28, 8, 8, state, save_data=False)
 
 menu_handler = menu.MenuHandler(encoder, accept_button, back_button, state, display, leds)
 
 def update_handler(timer):
     state.update()
-    menu_handler.render()
+    menu_handler.request_render(False)
     
 def sound_alarm():
     state.alarm_state = clock_state._ALARM_TEST
     state._sound_alarm()
-    menu_handler.render()
+    menu_handler.request_render()
     
 def unsound_alarm():
     state.alarm_state = clock_state._ALARM_OFF
     state._unsound_alarm()
-    menu_handler.render()
+    menu_handler.request_render()
 
 if __name__ == "__main__":
     
@@ -51,12 +52,17 @@ if __name__ == "__main__":
 
     FFT = menu.Functionality_Change_Lighting(None, "FFT", state, display, leds, menu_handler)
     cosntant = menu.Functionality_Change_Lighting(None, "Set Colour", state, display, leds, menu_handler)
+    breathe = menu.Functionality_Change_Lighting(None, "Breathe", state, display, leds, menu_handler)
+    spectrum_view = menu.Functionality_Spectrum(None, "Spectrum", state, display, leds, menu_handler)
     led_mode = menu.Functionality_Change_Lighting(None, "OFF", state, display, leds, menu_handler)
 
     alarm_time = menu.Functionality_AlarmTime(None, "Alarm Time", state, display, leds, menu_handler)
     change_rgb = menu.Functionality_ChangeRGB(None, "Change RGB", state, display, leds, menu_handler)
     change_time_format = menu.Functionality_ChangeTimeFormat(None, "Change Format", state, display, leds, menu_handler)
     frequency_change = menu.Functionality_FrequencyChange(None, "Change Freq.", state, display, leds, menu_handler)
+    seek = menu.Functionality_Seek(None, "Seek", state, display, leds, menu_handler)
+    stations = menu.Functionality_StationSelect(None, "Stations", state, display, leds, menu_handler)
+    scan = menu.Functionality_Scan(None, "Scan", state, display, leds, menu_handler)
 
     toggle_radio = menu.Functionality_Toggle(None, "Enable Radio", state, display, leds, menu_handler)
     toggle_radio.set_toggle_fns(state.enable_radio, state.disable_radio)
@@ -107,6 +113,9 @@ if __name__ == "__main__":
     menu_root.add_child(menu_radio)
     menu_radio.add_child(toggle_radio)
     menu_radio.add_child(frequency_change)
+    menu_radio.add_child(seek)
+    menu_radio.add_child(stations)
+    menu_radio.add_child(scan)
     menu_radio.add_child(radio_volume)
     menu_radio.add_child(mute_radio)
 
@@ -116,12 +125,15 @@ if __name__ == "__main__":
     
     lighting_state.add_child(FFT)
     lighting_state.add_child(cosntant)
+    lighting_state.add_child(breathe)
     lighting_state.add_child(led_mode)
+    lighting_state.add_child(spectrum_view)
     
     menu_handler.render()
 
     update_timer = Timer(mode=Timer.PERIODIC, freq=1, callback=update_handler)
     
-    # leds.fft_loop()
+    # Visualiser on the second core, the UI stays on this one
+    leds.start()
 
         
\ No newline at end of file
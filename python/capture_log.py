@@ -0,0 +1,117 @@
+import struct
+import utime
+
+
+# Record header: magic, version, sequence number, ticks_ms when written,
+# sample rate (Hz), samples and spectrum bins in the payload. The payload
+# follows as `samples` uint16 ADC readings, then `bins` float32 magnitudes
+# and `bins` float32 phases, all little-endian.
+HEADER_FORMAT = "<2sBxIIIHH"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+MAGIC = b"CF"
+VERSION = 1
+
+
+def record_size(samples, bins):
+    """
+    Return the size in bytes of one record.
+    """
+    return HEADER_SIZE + 2 * samples + 8 * bins
+
+
+def file_name(prefix, index):
+    return "{}{}.bin".format(prefix, index)
+
+
+class CaptureLog(object):
+    """
+    Appends visualiser frames to flash as fixed-size binary records. Each
+    file holds up to `records_per_file` records; after that the next file
+    of the ring is truncated and written, so at most `num_files` files
+    (the oldest being overwritten) are kept on flash.
+
+    Every record is a flash write that stalls the writer and, while the
+    flash is busy, the other core too. So only one frame in `every` is
+    logged, and logging stops after `max_records` records: by default
+    once the default ring is full, so a capture is a burst rather than a
+    constant rewrite of the same flash sectors.
+
+    prefix(str): Files are named prefix0.bin, prefix1.bin, ...
+    num_files(int): Files in the ring.
+    records_per_file(int): Records before moving to the next file.
+    every(int): Log one frame in this many.
+    max_records(int): Stop after this many records, None to keep
+        overwriting the ring.
+    """
+    def __init__(self, prefix="capture", num_files=4, records_per_file=64, every=16, max_records=256):
+        self.prefix = prefix
+        self.num_files = max(num_files, 1)
+        self.records_per_file = records_per_file
+        self.every = max(every, 1)
+        self.max_records = max_records
+        self._skip = 0
+
+        self._header = bytearray(HEADER_SIZE)
+        self._file = None
+        self._index = -1
+        self._in_file = 0
+
+        self.records = 0
+        self.bytes_written = 0
+
+    def write(self, samples, magnitudes, phases, sample_rate):
+        """
+        Offer one frame to the log. Returns True if it was written, False
+        if it was decimated away or the log is full.
+        samples(array): Raw ADC frame, array('H').
+        magnitudes(ndarray), phases(ndarray): float32 spectrum of the frame.
+        sample_rate(float): Sample rate of the frame in Hz.
+        """
+        if self.full():
+            return False
+        if self._skip:
+            self._skip -= 1
+            return False
+        self._skip = self.every - 1
+
+        if self._file is None or self._in_file >= self.records_per_file:
+            self._next_file()
+
+        struct.pack_into(
+            HEADER_FORMAT, self._header, 0,
+            MAGIC, VERSION, self.records, utime.ticks_ms() & 0xFFFFFFFF,
+            int(sample_rate), len(samples), len(magnitudes)
+        )
+        self.bytes_written += self._file.write(self._header)
+        self.bytes_written += self._file.write(samples)
+        self.bytes_written += self._file.write(magnitudes)
+        self.bytes_written += self._file.write(phases)
+
+        self._in_file += 1
+        self.records += 1
+        if self.full():
+            self.close()
+        return True
+
+    def full(self):
+        return self.max_records is not None and self.records >= self.max_records
+
+    def _next_file(self):
+        if self._file is not None:
+            self._file.close()
+
+        self._index = (self._index + 1) % self.num_files
+        self._file = open(file_name(self.prefix, self._index), "wb")
+        self._in_file = 0
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        """
+        Close the current file. The next write() starts a new one.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -1,4 +1,5 @@
 import time
+import _thread
 
 from machine import ADC
 from machine import I2C
@@ -8,6 +9,7 @@ from machine import RTC
 from machine import Timer
 
 import rda5807
+import station_index
 
 
 
@@ -56,6 +58,14 @@ _ALARM_TEST = 4
 _CLOCK_12HR = 0
 _CLOCK_24HR = 1
 
+# Indices into ClockState.versions, one counter per state domain.
+VER_TIME = 0
+VER_ALARM = 1
+VER_RADIO = 2
+VER_LEDS = 3
+VER_TEMP = 4
+_NUM_VERSIONS = 5
+
 
 def is_leap_year(year):
     return not year % 4 or not year % 100 or not year % 400
@@ -64,6 +74,13 @@ def is_leap_year(year):
 class ClockState():
 
     def __init__(self):
+        # Bumped whenever something shown from that domain may have changed.
+        self.versions = [0] * _NUM_VERSIONS
+
+        # Guards the LED and radio fields read by the LED visualiser, which
+        # may run on the second core.
+        self.lock = _thread.allocate_lock()
+
         self.rtc = RTC()
         self.rtc.datetime((2024, 1, 1, 0, 0, 0, 0, 0))
         self.clock_mode = _CLOCK_12HR
@@ -90,6 +107,7 @@ class ClockState():
         self.radio_muted = True
         self.radio_freq = 100.3
         self.radio_volume = 2
+        self.radio_rssi = 0
         
         self.mute_radio()
         
@@ -104,10 +122,17 @@ class ClockState():
             1070 : "CFAX",
             101.9 : "CFUV"
         }
+
+        # Stations found by the last band scan, see scan_stations()
+        self.station_index = station_index.StationIndex()
+        self.station_index.load()
+        self.band_scan = station_index.BandScan(self.radio, self.station_index, self._scan_done)
+        self._scan_callback = None
         
         self.led_states = {
             "Set Colour" : False,
             "FFT" : False,
+            "Breathe" : False,
             "OFF" : False # On = True Off = False
         }
 
@@ -121,8 +146,12 @@ class ClockState():
 
     def update(self):
         """
-        Update the state of the clock based on the current RTC time.
+        Update the state of the clock based on the current RTC time, and
+        save the stations of a finished band scan.
         """
+        self.versions[VER_TIME] += 1
+        self.band_scan.save()
+
         if self.alarm_state == _ALARM_ON:
             if self.get_time() == self.alarm_time:
                 self.alarm_state = _ALARM_SOUND
@@ -136,7 +165,20 @@ class ClockState():
                 self.alarm_state = _ALARM_SOUND
                 self._sound_alarm()
 
+    def version_sum(self, domains):
+        """
+        Return a value that changes whenever the version of any of the given
+        domains changes. Since the counters only increase, their sum does too.
+
+        domains(iterable): VER_* domain indices.
+        """
+        total = 0
+        for domain in domains:
+            total += self.versions[domain]
+        return total
+
     def _sound_alarm(self):
+        self.versions[VER_ALARM] += 1
         self.radio.update_reg(
             rda5807.RDA5807M_REG_CONFIG, rda5807.RDA5807M_FLG_DHIZ, 0)
 
@@ -156,6 +198,7 @@ class ClockState():
         self._alarm_sounding = True
 
     def _unsound_alarm(self):
+        self.versions[VER_ALARM] += 1
         self._pwm_pattern.deinit()
         self._pwm_freq.deinit()
         self._pwm.deinit()
@@ -234,6 +277,7 @@ class ClockState():
         now = list(self.rtc.datetime())
         now = now[:4] + list(time) + now[7:]
         self.rtc.datetime(now)
+        self.versions[VER_TIME] += 1
 
     def get_time(self):
         """
@@ -249,6 +293,7 @@ class ClockState():
         now = list(self.rtc.datetime())
         now = list(date) + now[3:]
         self.rtc.datetime(now)
+        self.versions[VER_TIME] += 1
 
     def get_date(self):
         """
@@ -262,6 +307,7 @@ class ClockState():
         mode(str): Clock display mode: "12hr" or "24hr".
         """
         self.clock_mode = _CLOCK_24HR if mode == "24hr" else _CLOCK_12HR
+        self.versions[VER_TIME] += 1
 
     def get_clock_mode_string(self):
         """
@@ -275,6 +321,7 @@ class ClockState():
 
     def set_tz_offset(self, offset):
         self.tz_offset = max(min(offset, 14), -12)
+        self.versions[VER_TIME] += 1
 
     def format_clock_string(self, datetime):
         year, month, day, _, hour, minute, sec, _ = datetime
@@ -320,6 +367,7 @@ class ClockState():
 
         self.alarm_volume = max(min(15, self.alarm_volume), 1)
         self.alarm_sdelay = max(min(self.alarm_sdelay, 60), 1)
+        self.versions[VER_ALARM] += 1
 
     def set_alarm_volume(self, volume):
         self.set_alarm(volume=volume)
@@ -329,6 +377,7 @@ class ClockState():
 
     def set_alarm_pattern(self, pattern):
         self.alarm_pattern = pattern % len(ALARM_PATTERN)
+        self.versions[VER_ALARM] += 1
 
     def get_alarm_pattern(self):
         return self.alarm_pattern
@@ -366,6 +415,7 @@ class ClockState():
         """
         self.alarm_state = _ALARM_ON
         self.alarm_enabled = True
+        self.versions[VER_ALARM] += 1
 
     def disable_alarm(self):
         """
@@ -390,6 +440,7 @@ class ClockState():
         self.alarm_stime = self.get_time()
         self._unsound_alarm()
         self.alarm_state = _ALARM_SNOOZE
+        self.versions[VER_ALARM] += 1
 
     def alarm_sounding(self):
         """
@@ -405,7 +456,7 @@ class ClockState():
         """
         if freq:
             freq = round(freq * 10) / 10
-            freq = max(min(freq, 108.1), 88.1)
+            freq = max(min(freq, station_index.LAST_MHZ), station_index.FIRST_MHZ)
 
             self.radio_freq = freq
             self.radio.set_frequency_MHz(freq)
@@ -414,6 +465,92 @@ class ClockState():
             self.radio_volume = max(min(volume, 15), 0)
             self.radio.set_volume(self.radio_volume)
 
+        self.versions[VER_RADIO] += 1
+
+    def seek_radio(self, up=True, callback=None):
+        """
+        Start seeking for the next or previous station without blocking.
+        When the seek ends, radio_freq and radio_rssi are updated and
+        callback() is called, from a timer callback.
+        up(bool): Seek up in frequency if True, down otherwise.
+        """
+        def seek_done(freq, rssi):
+            with self.lock:
+                self.radio_freq = round(freq * 10) / 10
+                self.radio_rssi = rssi
+                self.versions[VER_RADIO] += 1
+            if callback:
+                callback()
+
+        self.radio.start_seek(up, seek_done)
+        self.versions[VER_RADIO] += 1
+
+    def cancel_seek(self):
+        """
+        Stop a seek started with seek_radio(), staying on the frequency the
+        radio got to.
+        """
+        freq = self.radio.cancel_seek()
+        if freq is None:
+            return
+
+        with self.lock:
+            self.radio_freq = round(freq * 10) / 10
+            self.radio_rssi = 0
+            self.versions[VER_RADIO] += 1
+
+    def radio_seeking(self):
+        return self.radio.seeking
+
+    def scan_stations(self, callback=None):
+        """
+        Start a background scan of the band, rebuilding the station index.
+        callback() is called when it ends, from a timer callback.
+        """
+        self.cancel_seek()
+        self._scan_callback = callback
+        self.band_scan.start()
+        self.versions[VER_RADIO] += 1
+
+    def cancel_scan(self):
+        self.band_scan.cancel()
+
+    def scanning(self):
+        return self.band_scan.running
+
+    def _scan_done(self):
+        self.versions[VER_RADIO] += 1
+        callback = self._scan_callback
+        self._scan_callback = None
+        if callback:
+            callback()
+
+    def next_station(self, direction=1):
+        """
+        Tune to the next (direction > 0) or previous station in the index.
+        Returns False if the index is empty.
+        """
+        freq = self.station_index.step(self.radio_freq, direction)
+        if freq is None:
+            return False
+
+        self.set_radio(freq=freq)
+        return True
+
+    def get_station_name(self, freq=None):
+        """
+        Return the name of the station at freq, the current frequency by
+        default: its RDS name from the scan if one was received, else the
+        name from `stations`, else "".
+        """
+        if freq is None:
+            freq = self.radio_freq
+
+        station = self.station_index.find(freq)
+        if station >= 0 and self.station_index.name(station):
+            return self.station_index.name(station)
+        return self.stations.get(freq, "")
+
     def set_radio_volume(self, volume):
         self.set_radio(volume=volume)
 
@@ -425,14 +562,18 @@ class ClockState():
         Mute the radio module.
         """
         self.radio.mute(True)
-        self.radio_muted = True
+        with self.lock:
+            self.radio_muted = True
+            self.versions[VER_RADIO] += 1
 
     def unmute_radio(self):
         """
         Unmute the radio module.
         """
         self.radio.mute(not self.radio_enabled)
-        self.radio_muted = False
+        with self.lock:
+            self.radio_muted = False
+            self.versions[VER_RADIO] += 1
 
     def enable_radio(self):
         """
@@ -442,12 +583,14 @@ class ClockState():
         self.radio.mono(True)
         self.radio.set_frequency_MHz(self.radio_freq)
         self.radio.set_volume(self.radio_volume)
-        self.radio_enabled = True
+        with self.lock:
+            self.radio_enabled = True
         self.unmute_radio()
 
     def disable_radio(self):
         "Turn off the radio."
-        self.radio_enabled = False
+        with self.lock:
+            self.radio_enabled = False
         self.mute_radio()
 
     def set_led_color(self, color):
@@ -455,11 +598,37 @@ class ClockState():
         Set the color of the LEDs.
         color(tuple): Three-tuple of the components. (r, g, b)
         """
-        self.led_color = (
+        color = (
             max(min(color[0], 255), 0),
             max(min(color[1], 255), 0),
             max(min(color[2], 255), 0)
         )
+        with self.lock:
+            self.led_color = color
+            self.versions[VER_LEDS] += 1
+
+    def set_led_mode(self, mode):
+        """
+        Toggle the given LED mode, turning every other mode off.
+        mode(str): Key of led_states, e.g. "FFT".
+        """
+        with self.lock:
+            for item in self.led_states:
+                if item != mode:
+                    self.led_states[item] = False
+                else:
+                    self.led_states[item] = not self.led_states[item]
+
+            self.versions[VER_LEDS] += 1
+
+    def get_led_mode(self):
+        """
+        Return the name of the active LED mode, "OFF" if none is on.
+        """
+        for item in self.led_states:
+            if self.led_states[item]:
+                return item
+        return "OFF"
 
     def enable_led(self):
         """
@@ -473,7 +642,11 @@ class ClockState():
 
     def _poll_temp(self, timer):
         temp = self.temp_adc.read_u16()
+        previous = int(self.temp)
         self.temp = 27 - (temp * 3.3 / 65535 - 0.706) / 0.001721
 
+        if int(self.temp) != previous:
+            self.versions[VER_TEMP] += 1
+
     def get_temp_string(self):
         return "{:2d}C".format(max(min(int(self.temp), 99), -9))
@@ -0,0 +1,189 @@
+"""
+Host-side render benchmark for the menu screens.
+
+Renders every MenuSystem screen for a number of frames on the host stand-ins
+and reports, per screen, the draw calls, the bytes and SPI transactions
+flushed to the display and the wall time per frame. The clock face is driven
+by the 1 Hz tick (unforced renders); the other screens by alternating
+encoder turns.
+
+With --golden DIR, the last frame of each screen is compared with
+DIR/<screen>.pbm; --update-golden writes those files instead.
+
+Run from the python directory:
+    python3 host/bench_render.py [--frames N] [--golden DIR [--update-golden]]
+"""
+import argparse
+import os
+import time
+
+import hostenv
+hostenv.install()
+
+import clock_state
+import MenuSystem as menu
+from Display import Oled
+from push_button import PushButton
+from rotary_encoder import RotaryEncoder
+
+
+def build_menu(state, display):
+    handler = menu.MenuHandler(
+        RotaryEncoder(3, 4), PushButton(5), PushButton(10), state, display, None)
+
+    def item(cls, name, parent):
+        node = cls(None, name, state, display, None, handler)
+        if parent:
+            parent.add_child(node)
+        return node
+
+    clock = item(menu.Functionality_ClockDisplay, "display", None)
+    handler.root = clock
+    handler._current = clock
+
+    settings = item(menu.Functionality_MenuSelect, "Settings", clock)
+    alarm = item(menu.Functionality_MenuSelect, "Alarm Settings", settings)
+    radio = item(menu.Functionality_MenuSelect, "Radio Settings", settings)
+    lighting = item(menu.Functionality_MenuSelect, "Lighting", settings)
+
+    toggle_radio = item(menu.Functionality_Toggle, "Enable Radio", radio)
+    toggle_radio.set_toggle_fns(state.enable_radio, state.disable_radio)
+
+    volume = item(menu.Functionality_Roller, "Radio Volume", radio)
+    volume.set_roller_fns(state.set_radio_volume, state.get_radio_volume, 1)
+
+    pattern = item(menu.Functionality_AlarmPattern, "Alarm Pattern", alarm)
+    pattern.set_roller_fns(state.set_alarm_pattern, state.get_alarm_pattern)
+
+    screens = [
+        ("clock", clock),
+        ("menu_select", settings),
+        ("alarm_time", item(menu.Functionality_AlarmTime, "Alarm Time", alarm)),
+        ("alarm_pattern", pattern),
+        ("clock_time", item(menu.Functionality_ClockTime, "Clock Time", settings)),
+        ("clock_date", item(menu.Functionality_ClockDate, "Clock Date", settings)),
+        ("time_format", item(menu.Functionality_ChangeTimeFormat, "Change Format", settings)),
+        ("frequency", item(menu.Functionality_FrequencyChange, "Change Freq.", radio)),
+        ("toggle", toggle_radio),
+        ("roller", volume),
+        ("change_rgb", item(menu.Functionality_ChangeRGB, "Change RGB", settings)),
+        ("lighting", item(menu.Functionality_Change_Lighting, "FFT", lighting)),
+    ]
+    return handler, screens
+
+
+def advance_clock(state):
+    hour, minute, sec = state.get_time()
+    sec += 1
+    if sec == 60:
+        sec = 0
+        minute = (minute + 1) % 60
+    state.set_time((hour, minute, sec))
+    state.update()
+
+
+def write_pbm(path, fbuf):
+    width, height = fbuf.width, fbuf.height
+    rows = bytearray()
+    for y in range(height):
+        for xbyte in range(0, width, 8):
+            value = 0
+            for bit in range(8):
+                value = (value << 1) | fbuf.pixel(xbyte + bit, y)
+            rows.append(value)
+    with open(path, "wb") as f:
+        f.write(b"P4\n%d %d\n" % (width, height))
+        f.write(rows)
+
+
+def compare_golden(path, fbuf, update):
+    if update:
+        write_pbm(path, fbuf)
+        return "written"
+
+    if not os.path.exists(path):
+        return "missing"
+
+    actual = path + ".actual"
+    write_pbm(actual, fbuf)
+    with open(path, "rb") as f_expected, open(actual, "rb") as f_actual:
+        same = f_expected.read() == f_actual.read()
+    if same:
+        os.remove(actual)
+        return "ok"
+    return "DIFF"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--golden", metavar="DIR")
+    parser.add_argument("--update-golden", action="store_true")
+    args = parser.parse_args()
+
+    state = clock_state.ClockState()
+    state.enable_radio()
+    state.enable_alarm()
+
+    display = Oled(18, 19, 21, 20, 17)
+    oled = display.oled
+    spi = display.oled_spi
+
+    handler, screens = build_menu(state, display)
+
+    header = "{:<14} {:>9} {:>9} {:>9} {:>9} {:>9}".format(
+        "screen", "draws/f", "bytes/f", "txn/f", "ms/f", "skipped")
+    if args.golden:
+        header += "  golden"
+        os.makedirs(args.golden, exist_ok=True)
+    print(header)
+
+    failed = False
+    for name, item in screens:
+        handler._current = item
+        item.enter()
+        handler.render()
+
+        draws = oled.draw_calls
+        nbytes = spi.wire_bytes
+        transactions = display.cs.falling_edges
+        skipped = handler.frames_skipped
+        elapsed = 0
+
+        for frame in range(args.frames):
+            start = time.perf_counter()
+            if item is handler.root:
+                advance_clock(state)
+                handler.render(False)
+            else:
+                if frame % 2:
+                    item.ccw()
+                else:
+                    item.cw()
+                handler.render()
+            elapsed += time.perf_counter() - start
+
+        frames = max(args.frames, 1)
+        line = "{:<14} {:>9.1f} {:>9.1f} {:>9.1f} {:>9.2f} {:>9d}".format(
+            name,
+            (oled.draw_calls - draws) / frames,
+            (spi.wire_bytes - nbytes) / frames,
+            (display.cs.falling_edges - transactions) / frames,
+            1000 * elapsed / frames,
+            handler.frames_skipped - skipped,
+        )
+
+        if args.golden:
+            path = os.path.join(args.golden, name + ".pbm")
+            result = compare_golden(path, oled, args.update_golden)
+            failed = failed or result != "ok" and not args.update_golden
+            line += "  " + result
+
+        print(line)
+
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Host-side byte count benchmark for the SSD1306 I2C frame write paths.
+
+Compares the original per-page path (which re-sent all 8 pages for every
+page), the fixed page addressing path and the horizontal addressing burst
+for a full frame, a single changed page and an unchanged frame.
+
+Run from the python directory:
+    python3 host/bench_ssd1306_i2c.py
+"""
+import hostenv
+hostenv.install()
+
+from bus import I2CCapture
+from ssd1306 import SSD1306, SSD1306_I2C
+
+
+class LegacySSD1306_I2C(SSD1306_I2C):
+    """
+    The I2C write path as it was before horizontal addressing: three single
+    byte commands per page, and write_data() sending every page of the
+    frame each time it is called.
+    """
+    def show(self):
+        for Page in range(0, 8):
+            self.write_cmd(0xB0 | (Page & 0x0F))
+            self.write_cmd(0x02)
+            self.write_cmd(0x10)
+            self.write_data(self.buffer[Page << 7:(Page << 7) + 128])
+
+    def write_cmds(self, cmds):
+        SSD1306.write_cmds(self, cmds)
+
+    def write_data(self, buf):
+        for Page in range(0, 8):
+            self.i2c.writeto_mem(0x3C, 0x80, (0xB0 | (Page & 0x0F)).to_bytes(1, "big"))
+            self.i2c.writeto_mem(0x3C, 0x80, b'\x02')
+            self.i2c.writeto_mem(0x3C, 0x80, b'\x10')
+            self.write_list[1] = self.buffer[Page << 7:(Page << 7) + 128]
+            self.i2c.writevto(0x3C, self.write_list)
+
+
+def measure(display, i2c, update):
+    i2c.reset()
+    update(display)
+    display.show()
+    return i2c.transactions, i2c.wire_bytes
+
+
+def full_frame(display):
+    display.invalidate()
+
+
+def one_page(display):
+    display.buffer[3 * 128] ^= 0xFF
+
+
+def unchanged(display):
+    pass
+
+
+def main():
+    paths = (
+        ("original", lambda i2c: LegacySSD1306_I2C(128, 64, i2c)),
+        ("page mode", lambda i2c: SSD1306_I2C(128, 64, i2c)),
+        ("horizontal", lambda i2c: SSD1306_I2C(128, 64, i2c, horizontal=True)),
+    )
+    cases = (
+        ("full frame", full_frame),
+        ("one page", one_page),
+        ("unchanged", unchanged),
+    )
+
+    print("{:<12} {:<12} {:>12} {:>10}".format("path", "case", "transactions", "bytes"))
+    for name, make in paths:
+        i2c = I2CCapture()
+        display = make(i2c)
+        for case, update in cases:
+            transactions, nbytes = measure(display, i2c, update)
+            print("{:<12} {:<12} {:>12d} {:>10d}".format(name, case, transactions, nbytes))
+
+
+if __name__ == "__main__":
+    main()
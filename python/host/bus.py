@@ -0,0 +1,73 @@
+"""
+Capture sinks standing in for machine.I2C/machine.SPI on the host. They
+record every transaction and count the bytes that would go over the wire.
+"""
+
+
+class I2CCapture:
+    """
+    Records I2C writes. `wire_bytes` includes the address byte of each
+    transaction and the register byte of writeto_mem(). Reads return zeros.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.transactions = 0
+        self.payload_bytes = 0
+        self.wire_bytes = 0
+        self.log = []
+
+    def _record(self, addr, data):
+        data = bytes(data)
+        self.transactions += 1
+        self.payload_bytes += len(data)
+        self.wire_bytes += 1 + len(data)
+        self.log.append((addr, data))
+
+    def writeto(self, addr, buf, stop=True):
+        self._record(addr, buf)
+        return 1
+
+    def writevto(self, addr, vector, stop=True):
+        self._record(addr, b"".join(bytes(buf) for buf in vector))
+        return 1
+
+    def writeto_mem(self, addr, memaddr, buf, addrsize=8):
+        self._record(addr, bytes((memaddr,)) + bytes(buf))
+
+    def readfrom(self, addr, nbytes, stop=True):
+        self.transactions += 1
+        self.wire_bytes += 1 + nbytes
+        return bytes(nbytes)
+
+    def readfrom_into(self, addr, buf, stop=True):
+        self.transactions += 1
+        self.wire_bytes += 1 + len(buf)
+        for i in range(len(buf)):
+            buf[i] = 0
+
+    def readfrom_mem(self, addr, memaddr, nbytes, addrsize=8):
+        self.transactions += 1
+        self.wire_bytes += 2 + nbytes
+        return bytes(nbytes)
+
+
+class SPICapture:
+    """
+    Records SPI writes. SPI has no framing of its own, so transactions are
+    counted by the chip select Pin stand-in, see machine.Pin.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.writes = 0
+        self.wire_bytes = 0
+
+    def init(self, *args, **kwds):
+        pass
+
+    def write(self, buf):
+        self.writes += 1
+        self.wire_bytes += len(buf)
@@ -0,0 +1,155 @@
+"""
+Host stand-in for the MicroPython `framebuf` module, so display code can be
+run under CPython.
+
+Only the monochrome formats are supported. text() draws a placeholder glyph
+derived from the character code instead of the device's built-in 8x8 font:
+it has the same footprint, so frame sizes and dirty regions match the device
+but the images do not.
+
+Every drawing call made on a FrameBuffer is counted in its `draw_calls`.
+"""
+
+MONO_VLSB = 0
+MONO_HLSB = 3
+MONO_HMSB = 4
+
+
+def _glyph(char):
+    code = ord(char)
+    if code <= 0x20:
+        return bytes(8)
+
+    # columns 1..6, rows 0..6, like the device font's cell usage
+    seed = (code * 2654435761) & 0xFFFFFFFF
+    columns = [0]
+    for col in range(6):
+        columns.append(((seed >> (col * 5)) & 0x3E) | 0x41)
+    columns.append(0)
+    return bytes(columns)
+
+
+class FrameBuffer:
+    def __init__(self, buffer, width, height, format, stride=None):
+        self._fb_buffer = buffer
+        self._fb_width = width
+        self._fb_height = height
+        self._fb_format = format
+        self._fb_stride = stride or width
+        self.draw_calls = 0
+
+    def _index(self, x, y):
+        if self._fb_format == MONO_VLSB:
+            return (y >> 3) * self._fb_stride + x, y & 7
+
+        index = y * ((self._fb_stride + 7) >> 3) + (x >> 3)
+        if self._fb_format == MONO_HLSB:
+            return index, 7 - (x & 7)
+        return index, x & 7
+
+    def _get(self, x, y):
+        index, bit = self._index(x, y)
+        return (self._fb_buffer[index] >> bit) & 1
+
+    def _set(self, x, y, c):
+        if not (0 <= x < self._fb_width and 0 <= y < self._fb_height):
+            return
+
+        index, bit = self._index(x, y)
+        if c:
+            self._fb_buffer[index] |= 1 << bit
+        else:
+            self._fb_buffer[index] &= ~(1 << bit) & 0xFF
+
+    def _fill_rect(self, x, y, w, h, c):
+        for yy in range(max(y, 0), min(y + h, self._fb_height)):
+            for xx in range(max(x, 0), min(x + w, self._fb_width)):
+                self._set(xx, yy, c)
+
+    def pixel(self, x, y, c=None):
+        self.draw_calls += 1
+        if c is None:
+            if 0 <= x < self._fb_width and 0 <= y < self._fb_height:
+                return self._get(x, y)
+            return None
+
+        self._set(x, y, c)
+
+    def fill(self, c):
+        self.draw_calls += 1
+        value = 0xFF if c else 0x00
+        for i in range(len(self._fb_buffer)):
+            self._fb_buffer[i] = value
+
+    def fill_rect(self, x, y, w, h, c):
+        self.draw_calls += 1
+        self._fill_rect(x, y, w, h, c)
+
+    def hline(self, x, y, w, c):
+        self.draw_calls += 1
+        self._fill_rect(x, y, w, 1, c)
+
+    def vline(self, x, y, h, c):
+        self.draw_calls += 1
+        self._fill_rect(x, y, 1, h, c)
+
+    def rect(self, x, y, w, h, c, f=False):
+        self.draw_calls += 1
+        if f:
+            self._fill_rect(x, y, w, h, c)
+            return
+
+        self._fill_rect(x, y, w, 1, c)
+        self._fill_rect(x, y + h - 1, w, 1, c)
+        self._fill_rect(x, y, 1, h, c)
+        self._fill_rect(x + w - 1, y, 1, h, c)
+
+    def line(self, x1, y1, x2, y2, c):
+        self.draw_calls += 1
+        dx = abs(x2 - x1)
+        dy = -abs(y2 - y1)
+        sx = 1 if x1 < x2 else -1
+        sy = 1 if y1 < y2 else -1
+        err = dx + dy
+        while True:
+            self._set(x1, y1, c)
+            if x1 == x2 and y1 == y2:
+                break
+            e2 = 2 * err
+            if e2 >= dy:
+                err += dy
+                x1 += sx
+            if e2 <= dx:
+                err += dx
+                y1 += sy
+
+    def text(self, s, x, y, c=1):
+        self.draw_calls += 1
+        for k, char in enumerate(s):
+            columns = _glyph(char)
+            for col in range(8):
+                bits = columns[col]
+                for row in range(8):
+                    if bits >> row & 1:
+                        self._set(x + 8*k + col, y + row, c)
+
+    def blit(self, fbuf, x, y, key=-1, palette=None):
+        self.draw_calls += 1
+        for yy in range(fbuf._fb_height):
+            for xx in range(fbuf._fb_width):
+                c = fbuf._get(xx, yy)
+                if c != key:
+                    self._set(x + xx, y + yy, c)
+
+    def scroll(self, xstep, ystep):
+        self.draw_calls += 1
+        pixels = [
+            [self._get(xx, yy) for xx in range(self._fb_width)]
+            for yy in range(self._fb_height)
+        ]
+        for yy in range(self._fb_height):
+            for xx in range(self._fb_width):
+                sx = xx - xstep
+                sy = yy - ystep
+                if 0 <= sx < self._fb_width and 0 <= sy < self._fb_height:
+                    self._set(xx, yy, pixels[sy][sx])
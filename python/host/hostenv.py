@@ -0,0 +1,50 @@
+"""
+Set up CPython to run the device modules: puts the stand-ins in this
+directory and the device sources in the parent directory on sys.path, and
+adds the MicroPython ticks/sleep functions to the `time` module.
+
+Host scripts start with:
+    import hostenv
+    hostenv.install()
+"""
+import os
+import sys
+import time
+
+HOST_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIR = os.path.dirname(HOST_DIR)
+
+
+def ticks_ms():
+    return time.monotonic_ns() // 1000000
+
+
+def ticks_us():
+    return time.monotonic_ns() // 1000
+
+
+def ticks_diff(end, start):
+    return end - start
+
+
+def ticks_add(ticks, delta):
+    return ticks + delta
+
+
+def sleep_ms(ms):
+    time.sleep(ms / 1000)
+
+
+def sleep_us(us):
+    time.sleep(us / 1000000)
+
+
+def install():
+    for path in (SOURCE_DIR, HOST_DIR):
+        if path in sys.path:
+            sys.path.remove(path)
+        sys.path.insert(0, path)
+
+    for name in ("ticks_ms", "ticks_us", "ticks_diff", "ticks_add", "sleep_ms", "sleep_us"):
+        if not hasattr(time, name):
+            setattr(time, name, globals()[name])
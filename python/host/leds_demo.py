@@ -0,0 +1,66 @@
+"""
+Run the LED visualiser on a host thread, the way it runs on the second core
+of the board, feeding a test tone into the ADC stand-in.
+
+    python3 host/leds_demo.py [--seconds S] [--tone HZ] [--amplitude A]
+                              [--mode MODE] [--color R,G,B] [--engine fft|goertzel]
+
+The capture timer is fired from the main thread at roughly the sample rate
+and the LED colours are printed a few times a second.
+"""
+import argparse
+import itertools
+import math
+import time
+
+import hostenv
+hostenv.install()
+
+import clock_state
+from Leds_Handler import LEDS
+
+
+def tone(frequency, amplitude, sample_rate):
+    for n in itertools.count():
+        yield int(32768 + amplitude * math.sin(2 * math.pi * frequency * n / sample_rate))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=2)
+    parser.add_argument("--tone", type=float, default=2000)
+    parser.add_argument("--amplitude", type=float, default=1000)
+    parser.add_argument("--mode", default="FFT", help="key of ClockState.led_states")
+    parser.add_argument("--color", default="255,64,0", help="r,g,b for the colour modes")
+    parser.add_argument("--engine", default="fft", choices=("fft", "goertzel"))
+    args = parser.parse_args()
+
+    state = clock_state.ClockState()
+    state.enable_radio()
+    state.set_led_color(tuple(int(c) for c in args.color.split(",")))
+    state.set_led_mode(args.mode)
+
+    leds = LEDS(28, 8, 8, state, engine=args.engine)
+    leds.analog_value.samples = tone(args.tone, args.amplitude, leds.capture.rate)
+    leds.start()
+
+    deadline = time.monotonic() + args.seconds
+    next_print = 0
+    try:
+        while time.monotonic() < deadline:
+            if leds.capture.running:
+                for _ in range(leds.capture.frame_size):
+                    leds.capture._timer.fire()
+            if time.monotonic() >= next_print:
+                next_print = time.monotonic() + 0.5
+                print([leds.npleds[n] for n in range(leds.num_leds)])
+            time.sleep(leds.capture.frame_size / leds.capture.rate)
+    finally:
+        leds.stop()
+
+    print("frames captured {}, overruns {}, writes {}".format(
+        leds.capture.frames_captured, leds.capture.overruns, leds.npleds.writes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Host stand-in for the MicroPython `machine` module. Peripherals do nothing
+beyond recording what was done to them: buses capture their traffic (see
+bus.py) and timers only fire when fire() is called.
+"""
+
+from bus import I2CCapture, SPICapture
+
+
+def disable_irq():
+    return 0
+
+
+def enable_irq(state):
+    pass
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        self.id = id
+        self._value = 1 if pull == Pin.PULL_UP else 0
+        self.falling_edges = 0
+        if value is not None:
+            self._value = value
+
+    def init(self, mode=-1, pull=-1, value=None):
+        if value is not None:
+            self._value = value
+
+    def value(self, value=None):
+        if value is None:
+            return self._value
+
+        if self._value and not value:
+            self.falling_edges += 1
+        self._value = 1 if value else 0
+
+    def __call__(self, value=None):
+        return self.value(value)
+
+    def irq(self, handler=None, trigger=0, hard=False):
+        return self
+
+
+class SPI(SPICapture):
+    def __init__(self, id, baudrate=1000000, **kwds):
+        super().__init__()
+        self.id = id
+        self.baudrate = baudrate
+
+
+class I2C(I2CCapture):
+    def __init__(self, id, scl=None, sda=None, freq=400000):
+        super().__init__()
+        self.id = id
+
+
+class Timer:
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, id=-1, **kwds):
+        self.callback = None
+        self.mode = None
+        if kwds:
+            self.init(**kwds)
+
+    def init(self, mode=PERIODIC, freq=-1, period=-1, callback=None, hard=False):
+        self.mode = mode
+        self.callback = callback
+
+    def deinit(self):
+        self.callback = None
+
+    def fire(self):
+        """
+        Run the callback as if the timer expired.
+        """
+        callback = self.callback
+        if self.mode == Timer.ONE_SHOT:
+            self.callback = None
+        if callback:
+            callback(self)
+
+
+class RTC:
+    def __init__(self):
+        self._datetime = (2000, 1, 1, 5, 0, 0, 0, 0)
+
+    def datetime(self, datetime=None):
+        if datetime is None:
+            return self._datetime
+        self._datetime = tuple(datetime)
+
+
+class ADC:
+    """
+    Returns `value`, or the next value from the `samples` iterator when one
+    is set, to feed test signals into the code under test.
+    """
+    CORE_TEMP = 4
+
+    def __init__(self, pin):
+        self.pin = pin
+        # about 27 C for the core temperature sensor, mid-scale otherwise
+        self.value = 14021 if pin == ADC.CORE_TEMP else 32768
+        self.samples = None
+
+    def read_u16(self):
+        if self.samples is not None:
+            return next(self.samples)
+        return self.value
+
+
+class PWM:
+    def __init__(self, pin):
+        self.pin = pin
+        self._freq = 0
+        self._duty = 0
+
+    def freq(self, value=None):
+        if value is None:
+            return self._freq
+        self._freq = value
+
+    def duty_u16(self, value=None):
+        if value is None:
+            return self._duty
+        self._duty = value
+
+    def deinit(self):
+        pass
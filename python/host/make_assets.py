@@ -0,0 +1,95 @@
+"""
+Build asset_data.py, the packed font and icon blob loaded by assets.py.
+
+Glyphs are given as MONO_HLSB rows in hex, one string per glyph. Run from
+the python directory after changing them:
+    python3 host/make_assets.py
+"""
+import os
+import struct
+
+import hostenv
+
+VERSION = 1 # asset pack format, checked against assets._VERSION on load
+# (width, height, first code, glyphs), in assets.FONT_*/ICONS order
+SETS = [
+    # FONT_TALL: 8x14 digits "0" to "9"
+    (8, 14, ord("0"), [
+        "3c3c66666e6e7676666666663c3c",
+        "1818181838381818181818187e7e",
+        "3c3c666606060c0c303060607e7e",
+        "3c3c666606063c3c060666663c3c",
+        "06060e0e1e1e66667f7f06060606",
+        "7e7e60607c7c0606060666663c3c",
+        "3c3c666660607c7c666666663c3c",
+        "7e7e66660e0e1818181818181818",
+        "3c3c666666663c3c666666663c3c",
+        "3c3c666666663e3e060666663c3c",
+    ]),
+    # FONT_SMALL: 3x5 digits "0" to "9" in a 4x6 cell
+    (4, 6, ord("0"), [
+        "e0a0a0a0e000",
+        "40c04040e000",
+        "e020e080e000",
+        "e020e020e000",
+        "a0a0e0202000",
+        "e080e020e000",
+        "e080e0a0e000",
+        "e02020404000",
+        "e0a0e0a0e000",
+        "e0a0e020e000",
+    ]),
+    # ICONS: 8x8, see assets.ICON_*
+    (8, 8, 0, [
+        "18247e4242817e18",  # bell
+        "3c4291919d81423c",  # alarm clock
+        "0408ff81b5b581ff",  # radio
+        "1030f5f2f5301000",  # mute
+    ] + [
+        # signal bars, levels 0 to 4
+        "".join(
+            "{:02x}".format(sum(
+                0x80 >> (2 * bar)
+                for bar in range(4)
+                if row == 7 or bar < level and row >= 6 - 2 * bar
+            ))
+            for row in range(8)
+        )
+        for level in range(5)
+    ]),
+]
+
+
+def pack():
+    header = b"CRA" + bytes((VERSION, len(SETS)))
+    table_size = 6 * len(SETS)
+    table = b""
+    data = b""
+
+    for width, height, first, glyphs in SETS:
+        glyph_size = (width + 7) // 8 * height
+        offset = len(header) + table_size + len(data)
+        table += struct.pack("<BBBBH", width, height, first, len(glyphs), offset)
+        for glyph in glyphs:
+            bits = bytes.fromhex(glyph)
+            assert len(bits) == glyph_size, glyph
+            data += bits
+
+    return header + table + data
+
+
+def main():
+    blob = pack()
+    lines = ["# Generated by host/make_assets.py, do not edit.", "ASSETS = ("]
+    for i in range(0, len(blob), 16):
+        lines.append('    b"' + "".join("\\x{:02x}".format(b) for b in blob[i:i + 16]) + '"')
+    lines.append(")")
+
+    path = os.path.join(hostenv.SOURCE_DIR, "asset_data.py")
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    print("wrote {} ({} bytes)".format(path, len(blob)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+"""
+Host stand-in for the MicroPython `micropython` module.
+"""
+
+
+def const(value):
+    return value
@@ -0,0 +1,157 @@
+"""
+Load visualiser captures written by capture_log.CaptureLog into NumPy, and
+replay them into LEDS as test vectors.
+
+    python3 host/read_capture.py capture0.bin [capture1.bin ...]
+
+prints a summary of the records. From Python:
+
+    capture = read_capture.load(["capture0.bin", "capture1.bin"])
+    leds.capture = read_capture.ReplayCapture(capture)
+"""
+import argparse
+import glob
+import struct
+from array import array
+
+import numpy
+
+import hostenv
+hostenv.install()
+
+import capture_log
+
+
+class Capture(object):
+    """
+    Records from one or more capture files, ordered by sequence number.
+
+    sequence, ticks, sample_rate: one entry per record.
+    samples: (records, samples) uint16 raw ADC frames.
+    magnitudes, phases: (records, bins) float32 spectra.
+    """
+    def __init__(self, records):
+        records.sort(key=lambda record: record[0])
+        self.sequence = numpy.array([r[0] for r in records], dtype=numpy.uint32)
+        self.ticks = numpy.array([r[1] for r in records], dtype=numpy.uint32)
+        self.sample_rate = numpy.array([r[2] for r in records], dtype=numpy.uint32)
+        self.samples = numpy.array([r[3] for r in records], dtype=numpy.uint16)
+        self.magnitudes = numpy.array([r[4] for r in records], dtype=numpy.float32)
+        self.phases = numpy.array([r[5] for r in records], dtype=numpy.float32)
+
+    def __len__(self):
+        return len(self.sequence)
+
+
+def read_records(data):
+    """
+    Yield (sequence, ticks, sample_rate, samples, magnitudes, phases) for
+    each record in the bytes of one capture file. A truncated last record,
+    e.g. from a power cut mid-write, is ignored.
+    """
+    offset = 0
+    while offset + capture_log.HEADER_SIZE <= len(data):
+        magic, version, sequence, ticks, rate, num_samples, num_bins = struct.unpack_from(
+            capture_log.HEADER_FORMAT, data, offset)
+        if magic != capture_log.MAGIC or version != capture_log.VERSION:
+            raise ValueError("bad record header at offset {}".format(offset))
+
+        size = capture_log.record_size(num_samples, num_bins)
+        if offset + size > len(data):
+            break
+
+        offset += capture_log.HEADER_SIZE
+        samples = numpy.frombuffer(data, "<u2", num_samples, offset)
+        offset += 2 * num_samples
+        magnitudes = numpy.frombuffer(data, "<f4", num_bins, offset)
+        offset += 4 * num_bins
+        phases = numpy.frombuffer(data, "<f4", num_bins, offset)
+        offset += 4 * num_bins
+
+        yield sequence, ticks, rate, samples, magnitudes, phases
+
+
+def load(paths):
+    """
+    Load and merge capture files.
+    paths(list): File names, or a single prefix as passed to CaptureLog.
+    """
+    if isinstance(paths, str):
+        paths = sorted(glob.glob(paths + "*.bin"))
+
+    records = []
+    for path in paths:
+        with open(path, "rb") as f:
+            records.extend(read_records(f.read()))
+    return Capture(records)
+
+
+class ReplayCapture(object):
+    """
+    Stands in for adc_capture.AdcCapture, handing out the recorded frames
+    in order. take() returns None once every frame was handed out, unless
+    `loop` is set.
+    """
+    def __init__(self, capture, loop=False):
+        self._capture = capture
+        self.loop = loop
+        self.frame_size = capture.samples.shape[1]
+        self.rate = int(capture.sample_rate[0]) if len(capture) else 0
+        self._frame = array("H", bytes(2 * self.frame_size))
+        self._next = 0
+        self._taken = -1
+
+        self.frames_captured = 0
+        self.overruns = 0
+        self.running = False
+
+    def start(self):
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+    def take(self):
+        if self._taken >= 0:
+            return None
+        if self._next >= len(self._capture):
+            if not self.loop or not len(self._capture):
+                return None
+            self._next = 0
+
+        self._taken = self._next
+        self._next += 1
+        self._frame[:] = array("H", self._capture.samples[self._taken].tobytes())
+        self.frames_captured += 1
+        return self._frame
+
+    def release(self):
+        self._taken = -1
+
+    def sample_rate(self):
+        if self._taken >= 0:
+            return int(self._capture.sample_rate[self._taken])
+        return self.rate
+
+    def done(self):
+        return not self.loop and self._next >= len(self._capture)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("paths", nargs="+")
+    args = parser.parse_args()
+
+    capture = load(args.paths)
+    print("{} records".format(len(capture)))
+    if len(capture):
+        print("sequence {}..{}, {} samples, {} bins, {}-{} Hz".format(
+            capture.sequence[0], capture.sequence[-1],
+            capture.samples.shape[1], capture.magnitudes.shape[1],
+            capture.sample_rate.min(), capture.sample_rate.max()))
+        peaks = capture.magnitudes[:, 1:].argmax(axis=1) + 1
+        print("peak bins: {}".format(" ".join(str(p) for p in peaks[:32])))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+"""
+Run a device script on the host stand-ins:
+    python3 host/run.py <script.py> [args...]
+"""
+import runpy
+import sys
+
+import hostenv
+
+
+def main():
+    if len(sys.argv) < 2:
+        raise SystemExit(__doc__.strip())
+
+    hostenv.install()
+    sys.argv = sys.argv[1:]
+    runpy.run_path(sys.argv[0], run_name="__main__")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+"""
+Host checks for the device modules, run against the stand-ins in host/:
+
+    cd python
+    python3 -m pytest host/tests
+
+The ulab stand-in needs NumPy; checks that use it are skipped without it.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hostenv
+hostenv.install()
@@ -0,0 +1,101 @@
+import itertools
+import threading
+import time
+
+import machine
+from adc_capture import AdcCapture
+
+
+_FRAME_SIZE = 16
+
+
+def make_capture(num_frames=3):
+    adc = machine.ADC(28)
+    adc.samples = itertools.cycle(range(65536)) # a whole number of frames
+    capture = AdcCapture(adc, 8000, _FRAME_SIZE, num_frames)
+    capture.start()
+    return capture
+
+
+def fire_frames(capture, count):
+    for _ in range(count * _FRAME_SIZE):
+        capture._timer.fire()
+
+
+def test_take_returns_complete_frames():
+    capture = make_capture()
+    assert capture.take() is None
+
+    fire_frames(capture, 1)
+    frame = capture.take()
+    assert list(frame) == list(range(_FRAME_SIZE))
+    assert capture.take() is None # one frame at a time
+    capture.release()
+    assert capture.take() is None
+
+
+def test_taken_frame_is_never_overwritten():
+    capture = make_capture()
+    fire_frames(capture, 1)
+    frame = capture.take()
+    held = list(frame)
+
+    fire_frames(capture, 10)
+    assert list(frame) == held
+    assert capture.overruns == 9
+
+    capture.release()
+    frame = capture.take()
+    assert frame[0] == _FRAME_SIZE # the frame published before the ring filled
+    capture.release()
+
+
+def test_take_skips_to_the_newest_frame():
+    capture = make_capture(num_frames=4)
+    fire_frames(capture, 3)
+    frame = capture.take()
+    assert frame[0] == 2 * _FRAME_SIZE
+    assert capture.frames_skipped == 2
+    assert capture.overruns == 0
+
+
+def test_handoff_between_threads():
+    # The interrupt and the visualiser run on different cores on the board,
+    # here on two threads.
+    capture = make_capture()
+    done = threading.Event()
+    errors = []
+
+    def interrupt():
+        while not done.is_set():
+            capture._timer.fire()
+
+    def consumer():
+        for _ in range(300):
+            frame = capture.take()
+            if frame is None:
+                time.sleep(0)
+                continue
+            first = list(frame)
+            time.sleep(0.0005)
+            if list(frame) != first:
+                errors.append("frame changed while taken")
+            if first != list(range(first[0], first[0] + _FRAME_SIZE)) or first[0] % _FRAME_SIZE:
+                errors.append("torn frame {}".format(first[:3]))
+            capture.release()
+
+    def run_interrupt():
+        try:
+            interrupt()
+        except Exception as e:
+            errors.append(repr(e))
+
+    threads = [threading.Thread(target=run_interrupt), threading.Thread(target=consumer)]
+    threads[0].start()
+    threads[1].start()
+    threads[1].join()
+    done.set()
+    threads[0].join()
+
+    assert not errors
+    assert capture.frames_captured > 0
@@ -0,0 +1,52 @@
+from array import array
+
+import pytest
+
+import capture_log
+from capture_log import CaptureLog
+
+
+def write_frames(log, count, rate=10000):
+    samples = array("H", range(128))
+    spectrum = array("f", bytes(4 * 64))
+    return [log.write(samples, spectrum, spectrum, rate) for _ in range(count)]
+
+
+def test_decimation_and_record_cap(tmp_path):
+    log = CaptureLog(str(tmp_path / "capture"), num_files=2, records_per_file=2, every=4, max_records=3)
+    written = write_frames(log, 20)
+
+    assert written[:9] == [True, False, False, False, True, False, False, False, True]
+    assert log.records == 3
+    assert log.full()
+    assert not any(written[9:])
+
+    size = capture_log.record_size(128, 64)
+    assert (tmp_path / "capture0.bin").stat().st_size == 2 * size
+    assert (tmp_path / "capture1.bin").stat().st_size == size
+
+
+def test_ring_without_cap(tmp_path):
+    log = CaptureLog(str(tmp_path / "capture"), num_files=2, records_per_file=2, every=1, max_records=None)
+    assert all(write_frames(log, 10))
+    log.close()
+    assert log.records == 10
+
+
+def test_replay_uses_recorded_sample_rate(tmp_path):
+    pytest.importorskip("numpy")
+    import read_capture
+    import clock_state
+    from Leds_Handler import LEDS
+
+    prefix = str(tmp_path / "capture")
+    log = CaptureLog(prefix, every=1)
+    write_frames(log, 2, rate=10000)
+    log.close()
+
+    leds = LEDS(28, 8, 8, clock_state.ClockState())
+    leds.capture = read_capture.ReplayCapture(read_capture.load(prefix))
+    leds.capture.rate = 20000 # anything but the recorded rate
+    leds._step_fft(0)
+
+    assert leds.frequency_resolution == pytest.approx(10000 / 128)
@@ -0,0 +1,47 @@
+import machine
+import rda5807
+
+
+def make_radio():
+    i2c = machine.I2C(0)
+    return rda5807.Radio(i2c), i2c
+
+
+def last_config(i2c):
+    for addr, data in reversed(i2c.log):
+        if len(data) == 3 and data[0] == rda5807.RDA5807M_REG_CONFIG:
+            return (data[1] << 8) | data[2]
+    return None
+
+
+def test_config_writes_keep_a_running_seek_going():
+    radio, i2c = make_radio()
+    radio.start_seek(True)
+    assert last_config(i2c) & rda5807.RDA5807M_FLG_SEEK
+
+    radio.mute(True)
+    radio.bass_boost(False)
+    assert last_config(i2c) & rda5807.RDA5807M_FLG_SEEK
+    assert not last_config(i2c) & rda5807.RDA5807M_FLG_DMUTE
+
+    radio.cancel_seek()
+    assert not last_config(i2c) & rda5807.RDA5807M_FLG_SEEK
+    radio.mute(False)
+    assert not last_config(i2c) & rda5807.RDA5807M_FLG_SEEK
+
+
+def test_seek_times_out(monkeypatch):
+    radio, i2c = make_radio()
+    results = []
+    now = [1000]
+    monkeypatch.setattr(rda5807.utime, "ticks_ms", lambda: now[0])
+
+    radio.start_seek(True, lambda freq, rssi: results.append((freq, rssi)))
+    radio._seek_timer.fire() # STC never sets on the host bus
+    assert radio.seeking and not results
+
+    now[0] += rda5807.SEEK_TIMEOUT_MS
+    radio._seek_timer.fire()
+    assert not radio.seeking
+    assert results == [(radio.start_frequency_MHz, 0)]
+    assert not last_config(i2c) & rda5807.RDA5807M_FLG_SEEK
@@ -0,0 +1,14 @@
+import datetime
+
+import rda5807
+
+
+def test_mjd_to_date_matches_datetime():
+    epoch = datetime.date(1858, 11, 17) # MJD 0
+    for mjd in list(range(15000, 80000, 97)) + [40587, 51543, 51544, 51603, 51604, 60000]:
+        date = epoch + datetime.timedelta(days=mjd)
+        assert rda5807.mjd_to_date(mjd) == (date.year, date.month, date.day, date.weekday())
+
+
+def test_mjd_to_date_unix_epoch():
+    assert rda5807.mjd_to_date(40587) == (1970, 1, 1, 3)
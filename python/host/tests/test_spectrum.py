@@ -0,0 +1,65 @@
+import math
+from array import array
+
+import pytest
+
+numpy = pytest.importorskip("numpy")
+
+import Leds_Handler
+
+
+def tone(size, frequency, amplitude=1000, phase=0.3):
+    n = numpy.arange(size)
+    return 32768 + amplitude * numpy.cos(2 * math.pi * frequency * n / size + phase)
+
+
+@pytest.mark.parametrize("size", [64, 128, 256])
+@pytest.mark.parametrize("window", [None, "hann"])
+def test_real_fft_matches_numpy(size, window):
+    rng = numpy.random.default_rng(size)
+    samples = rng.integers(0, 65536, size).astype(numpy.float64)
+
+    fft = Leds_Handler.RealFFT(size, window)
+    real, imaginary = fft.transform(samples)
+
+    x = (samples - samples.mean()) * numpy.array(Leds_Handler.window_values(size, window))
+    expected = numpy.fft.rfft(x)[:size // 2]
+    scale = numpy.abs(expected).max()
+    assert numpy.allclose(real, expected.real, atol=1e-5 * scale)
+    assert numpy.allclose(imaginary, expected.imag, atol=1e-5 * scale)
+
+
+def test_spectrum_magnitudes_and_phases():
+    real = numpy.array([3.0, 0.0, -1.0], dtype=numpy.float32)
+    imaginary = numpy.array([4.0, 2.0, 0.0], dtype=numpy.float32)
+
+    magnitudes, phases = Leds_Handler.spectrum(real, imaginary)
+
+    assert numpy.allclose(magnitudes, [5.0, 2.0, 1.0])
+    assert numpy.allclose(phases, [math.atan2(4, 3), math.pi / 2, math.pi])
+
+
+@pytest.mark.parametrize("layout", ["linear", "log"])
+def test_goertzel_centre_tone_matches_fft_band_average(layout):
+    size = 128
+    edges = Leds_Handler.band_edges(size // 2, 8, layout)
+    bank = Leds_Handler.GoertzelBank(size, edges)
+    window = numpy.array(Leds_Handler.window_values(size, "hann"))
+
+    for band, centre in enumerate(bank.centres):
+        samples = tone(size, centre)
+        magnitudes, _ = bank.process(array("H", samples.astype(int)))
+
+        bins = numpy.abs(numpy.fft.rfft((samples - samples.mean()) * window))
+        expected = bins[edges[band]:edges[band + 1]].mean()
+        assert magnitudes[band] == pytest.approx(expected, rel=0.05)
+
+
+def test_goertzel_lights_a_band_for_every_tone():
+    size = 128
+    bank = Leds_Handler.GoertzelBank(size, Leds_Handler.band_edges(size // 2, 8))
+    centre_level = 1000 * size / 2
+
+    for frequency in numpy.arange(1, 63, 0.5):
+        magnitudes, _ = bank.process(array("H", tone(size, frequency).astype(int)))
+        assert max(magnitudes) > 0.25 * centre_level / 8
@@ -0,0 +1,86 @@
+import pytest
+
+from bus import I2CCapture
+from ssd1306 import SSD1306_I2C
+
+
+def make_display(horizontal=False):
+    i2c = I2CCapture()
+    display = SSD1306_I2C(128, 64, i2c, horizontal=horizontal)
+    display.show()
+    i2c.reset()
+    return display, i2c
+
+
+def data_writes(i2c):
+    return [data[1:] for addr, data in i2c.log if data[:1] == b"\x40"]
+
+
+@pytest.mark.parametrize("horizontal", [False, True])
+def test_unchanged_frame_sends_nothing(horizontal):
+    display, i2c = make_display(horizontal)
+    display.show()
+    assert i2c.transactions == 0
+    assert display.bytes_saved > 0
+
+
+def test_only_changed_pages_are_sent():
+    display, i2c = make_display()
+    display.pixel(5, 3 * 8, 1)
+    display.show()
+
+    assert data_writes(i2c) == [bytes(display.buffer[3 * 128:4 * 128])]
+    # page 3, from column 2
+    assert (0x3C, b"\x00\xB3\x02\x10") in i2c.log
+
+    i2c.reset()
+    display.show()
+    assert i2c.transactions == 0
+
+
+def test_invalidate_resends_every_page():
+    display, i2c = make_display()
+    display.invalidate()
+    display.show()
+    assert len(data_writes(i2c)) == 8
+
+
+def test_horizontal_sends_dirty_range_in_one_burst():
+    display, i2c = make_display(horizontal=True)
+    display.pixel(0, 2 * 8, 1)
+    display.pixel(0, 5 * 8, 1)
+    display.show()
+
+    assert data_writes(i2c) == [bytes(display.buffer[2 * 128:6 * 128])]
+
+
+def test_present_and_flush_step():
+    display, i2c = make_display()
+    display.pixel(0, 1 * 8, 1)
+    display.present()
+    display.fill(0) # the next frame does not touch the presented one
+
+    assert display.flush_step() is True # page 1 sent, pages 2 to 7 left
+    assert data_writes(i2c) == [bytes([1]) + bytes(127)]
+    assert display.flush_step() is False
+    assert len(data_writes(i2c)) == 1
+
+    i2c.reset()
+    display.present()
+    while display.flush_step():
+        pass
+    assert len(data_writes(i2c)) == 1
+
+
+def test_present_coalesces_pending_frames():
+    display, i2c = make_display()
+    display.pixel(0, 0, 1)
+    display.pixel(0, 7 * 8, 1)
+    display.present()
+    assert display.flush_step() is True
+
+    display.present()
+    assert display.frames_coalesced == 1
+    while display.flush_step():
+        pass
+    assert len(data_writes(i2c)) == 2
@@ -0,0 +1,84 @@
+import station_index
+from station_index import StationIndex
+
+
+def make_index():
+    index = StationIndex()
+    for freq, rssi, name in ((88.1, 40, b"CBC"), (94.5, 55, b"ROCK 945"), (101.3, 30, b"")):
+        index.add(station_index.channel(freq), rssi, name)
+    index.rebuild()
+    return index
+
+
+def test_channel_round_trip():
+    assert station_index.channel(87.5) == 0
+    assert station_index.channel(108.0) == station_index.NUM_CHANNELS - 1
+    assert station_index.channel(80.0) == 0
+    assert station_index.frequency(station_index.channel(99.9)) == 99.9
+
+
+def test_find_and_names():
+    index = make_index()
+    assert index.find(94.5) == 1
+    assert index.find(94.6) == -1
+    assert index.name(0) == "CBC"
+    assert index.name(1) == "ROCK 945"
+    assert index.name(2) == ""
+
+
+def test_step_wraps_around_the_band():
+    index = make_index()
+    assert index.step(88.1, 1) == 94.5
+    assert index.step(90.0, 1) == 94.5
+    assert index.step(101.3, 1) == 88.1
+    assert index.step(88.1, -1) == 101.3
+    assert index.step(94.5, -1) == 88.1
+    assert index.step(100.0, -1) == 94.5
+    assert StationIndex().step(100.0, 1) is None
+
+
+def test_save_load(tmp_path):
+    path = str(tmp_path / "stations.bin")
+    make_index().save(path)
+
+    index = StationIndex()
+    assert index.load(path)
+    assert index.count == 3
+    assert [index.frequency(n) for n in range(3)] == [88.1, 94.5, 101.3]
+    assert list(index.rssi[:3]) == [40, 55, 30]
+    assert index.name(1) == "ROCK 945"
+    assert index.step(90.0, 1) == 94.5
+
+
+def test_load_rejects_bad_files(tmp_path):
+    index = make_index()
+    assert not index.load(str(tmp_path / "missing.bin"))
+    assert index.count == 0
+
+    path = tmp_path / "bad.bin"
+    path.write_bytes(b"XX\x01\x00")
+    assert not index.load(str(path))
+
+    make_index().save(str(path))
+    path.write_bytes(path.read_bytes()[:-1])
+    assert not index.load(str(path))
+
+
+def test_scan_saves_outside_the_timer(tmp_path, monkeypatch):
+    import machine
+    import rda5807
+
+    monkeypatch.chdir(tmp_path)
+    index = StationIndex()
+    scan = station_index.BandScan(rda5807.Radio(machine.I2C(0)), index)
+    scan.start()
+    index.add(station_index.channel(94.5), 55, b"ROCK 945")
+    scan.cancel()
+
+    assert not scan.running and scan.save_pending
+    assert not (tmp_path / "stations.bin").exists()
+    assert index.find(94.5) == 0 # table rebuilt when the scan ended
+
+    assert scan.save()
+    assert not scan.save_pending
+    assert StationIndex().load(str(tmp_path / "stations.bin"))
@@ -0,0 +1,4 @@
+"""
+Host stand-in for ulab, backed by NumPy. Only the parts of the ulab API used
+by the device code are provided.
+"""
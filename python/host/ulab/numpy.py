@@ -0,0 +1,54 @@
+"""
+ulab.numpy on top of NumPy. Differences from NumPy that the device code
+relies on are reproduced: np.float is the (single precision) float dtype
+and np.fft.fft takes and returns separate real and imaginary arrays.
+"""
+import numpy as _np
+from numpy import *
+
+float = _np.float32
+uint16 = _np.uint16
+int16 = _np.int16
+uint8 = _np.uint8
+
+
+def array(values, dtype=float):
+    return _np.array(values, dtype=dtype)
+
+
+def empty(shape, dtype=float):
+    return _np.zeros(shape, dtype=dtype)
+
+
+def zeros(shape, dtype=float):
+    return _np.zeros(shape, dtype=dtype)
+
+
+def ones(shape, dtype=float):
+    return _np.ones(shape, dtype=dtype)
+
+
+def arange(*args, dtype=None):
+    return _np.arange(*args, dtype=dtype)
+
+
+def linspace(start, stop, num=50, endpoint=True, dtype=float):
+    return _np.linspace(start, stop, num, endpoint=endpoint).astype(dtype)
+
+
+class fft:
+    @staticmethod
+    def fft(real, imaginary=None):
+        values = _np.asarray(real, dtype=_np.float64)
+        if imaginary is not None:
+            values = values + 1j * _np.asarray(imaginary, dtype=_np.float64)
+        result = _np.fft.fft(values)
+        return result.real.astype(float), result.imag.astype(float)
+
+    @staticmethod
+    def ifft(real, imaginary=None):
+        values = _np.asarray(real, dtype=_np.float64)
+        if imaginary is not None:
+            values = values + 1j * _np.asarray(imaginary, dtype=_np.float64)
+        result = _np.fft.ifft(values)
+        return result.real.astype(float), result.imag.astype(float)
@@ -0,0 +1,13 @@
+"""
+Host stand-in for the MicroPython `utime` module.
+"""
+from time import *
+
+import hostenv
+
+ticks_ms = hostenv.ticks_ms
+ticks_us = hostenv.ticks_us
+ticks_diff = hostenv.ticks_diff
+ticks_add = hostenv.ticks_add
+sleep_ms = hostenv.sleep_ms
+sleep_us = hostenv.sleep_us
@@ -33,9 +33,13 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
+import utime
+
 from machine import RTC
+from machine import Timer
 
 random_access_address = 17
+sequential_access_address = 16 # reads start at register 0x0A
 
 #Register addresses
 RDA5807M_REG_CHIPID = 0x00
@@ -81,6 +85,8 @@ RDA5807M_FLG_FREQMODE = 0x0001
 RDA5807M_FLG_FMTRUE = 0x0100
 RDA5807M_FLG_FMREADY = 0x0080
 RDA5807M_FLG_BLOCKE = 0x0010
+RDA5807M_FLG_STC = 0x4000
+RDA5807M_FLG_SF = 0x2000
 RDA5807P_FLG_STCIEN = 0x4000
 RDA5807P_FLG_I2S = 0x0040
 RDA5807P_FLG_I2SSLAVE = 0x1000
@@ -96,6 +102,39 @@ RDA5800_FLG_SPACE_200K = 0x0001
 RDA5800_FLG_SPACE_50K = 0x0004
 RDA5800_FLG_BAND_JAPAN = 0x0002
 
+#Writable registers kept in the shadow, and the bits of each that the chip
+#clears by itself once the action they trigger is done
+SHADOW_FIRST_REG = RDA5807M_REG_CONFIG
+SHADOW_LAST_REG = RDA5807M_REG_BLEND
+SELF_CLEARING = {
+    RDA5807M_REG_CONFIG : RDA5807M_FLG_SEEK | RDA5807M_FLG_RESET,
+    RDA5807M_REG_TUNING : RDA5807M_FLG_TUNE
+}
+
+SEEK_POLL_MS = 40 # interval between STC polls while seeking
+SEEK_TIMEOUT_MS = 8000 # give up a seek that has not set STC by then
+
+RDS_PS_LENGTH = 8
+RDS_RT_LENGTH = 64
+_MJD_UNIX_EPOCH = 40587 # Modified Julian Date of 1970-01-01
+
+
+def mjd_to_date(mjd):
+
+    """ Convert a Modified Julian Date to (year, month, day, weekday), weekday
+    0 = Monday, in integer arithmetic only """
+
+    days = mjd - _MJD_UNIX_EPOCH + 719468 # days since 0000-03-01
+    era = days // 146097
+    day_of_era = days - era * 146097
+    year_of_era = (day_of_era - day_of_era // 1460 + day_of_era // 36524 - day_of_era // 146096) // 365
+    day_of_year = day_of_era - (365 * year_of_era + year_of_era // 4 - year_of_era // 100)
+    month_index = (5 * day_of_year + 2) // 153 # March = 0
+    day = day_of_year - (153 * month_index + 2) // 5 + 1
+    month = month_index + 3 if month_index < 10 else month_index - 9
+    year = year_of_era + era * 400 + (1 if month <= 2 else 0)
+    return year, month, day, (mjd + 2) % 7
+
 rds_program_types_europe = [
 "No programme type defined", "News", "Current affairs", "Information",
 "Sport", "Education", "Drama", "Culture", "Science", "Varied",
@@ -122,6 +161,38 @@ class Radio:
         """
 
         self.i2c = i2c
+
+        # Last values written to registers 0x02 to 0x07, without the
+        # self-clearing bits, so bit updates need no read first
+        self.shadow = [0] * (SHADOW_LAST_REG - SHADOW_FIRST_REG + 1)
+        self._write_buf = bytearray(3)
+
+        # Registers 0x0A (STATUS) to 0x0F (RDSD) from the last read_status()
+        self.status_block = bytearray(2 * (RDA5807M_REG_RDSD - RDA5807M_REG_STATUS + 1))
+        self.reads = 0
+        self.writes = 0
+        self.reads_saved = 0
+
+        self.seeking = False
+        self._seek_start = 0
+        self._seek_callback = None
+        self._seek_timer = Timer()
+
+        # RDS decoder state, see update_rds(). The buffers are allocated
+        # once; decoding only writes into them.
+        self.station_name = bytearray(b" " * RDS_PS_LENGTH)
+        self.station_name_buffer = bytearray(b" " * RDS_PS_LENGTH)
+        self.radio_text = bytearray(b" " * RDS_RT_LENGTH)
+        self.radio_text_buffer = bytearray(b" " * RDS_RT_LENGTH)
+        self._group_handlers = (
+            self._rds_group_0, None, self._rds_group_2, None,
+            self._rds_group_4, None, None, None,
+            None, None, None, None,
+            None, None, None, None
+        )
+        self.rds_groups = 0
+        self.rds_errors = 0
+
         self.mute_flag = False
         self.bass_boost_flag = True
         self.mono_flag = False
@@ -173,15 +244,30 @@ class Radio:
 
         """ Clear RDS data, e.g. after retuning """
 
+        _fill(self.station_name, 0x20)
+        _fill(self.station_name_buffer, 0x20)
+        _fill(self.radio_text, 0x20)
+        _fill(self.radio_text_buffer, 0x20)
+        self.station_name_received = False
+        self.radio_text_received = False
         self.last_ab = 0
-        self.station_name = [" " for i in range(8)]
-        self.station_name_buffer = [" " for i in range(8)]
-        self.radio_text = [" " for i in range(64)]
-        self.radio_text_buffer = [" " for i in range(64)]
         self.last_offset = 0
         self.last_st_offset = 0
+
+        self.program_id = 0
+        self.program_type = 0
+        self.traffic_program = False
+        self.traffic_announcement = False
+
+        # Last clock time received, UTC, and the local offset in half hours
+        self.ct_received = False
+        self.ct_year = 0
+        self.ct_month = 0
+        self.ct_day = 0
+        self.ct_weekday = 0
         self.hours = 0
         self.minutes = 0
+        self.ct_offset = 0
 
     def read_reg(self, reg):
 
@@ -189,23 +275,71 @@ class Radio:
 
         self.i2c.writeto(random_access_address, bytes([reg]))
         data = self.i2c.readfrom(random_access_address, 2)
+        self.reads += 1
         return (data[0] << 8) | data[1]
 
     def write_reg(self, reg, data):
 
         """ Write data to i2c register """
 
-        data = bytes([reg, data >> 8, data&0xff])
-        self.i2c.writeto(random_access_address, data)
+        buf = self._write_buf
+        buf[0] = reg
+        buf[1] = (data >> 8) & 0xff
+        buf[2] = data & 0xff
+        self.i2c.writeto(random_access_address, buf)
+        self.writes += 1
+
+        if SHADOW_FIRST_REG <= reg <= SHADOW_LAST_REG:
+            self.shadow[reg - SHADOW_FIRST_REG] = data & ~SELF_CLEARING.get(reg, 0)
+
+    def read_status(self):
+
+        """ Read STATUS, RSSI and the four RDS blocks (registers 0x0A to
+        0x0F) in one sequential read into .status_block """
+
+        self.i2c.readfrom_into(sequential_access_address, self.status_block)
+        self.reads += 1
+
+    def status_reg(self, reg):
+
+        """ Value of a register 0x0A to 0x0F from the last read_status() """
+
+        offset = 2 * (reg - RDA5807M_REG_STATUS)
+        return (self.status_block[offset] << 8) | self.status_block[offset + 1]
+
+    def shadow_reg(self, reg):
+
+        """ Last value written to a register 0x02 to 0x07, self-clearing bits excluded """
+
+        return self.shadow[reg - SHADOW_FIRST_REG]
 
     def update_reg(self, reg, mask, value):
 
-        """ Update specific bits in I2C register """
+        """ Update specific bits in I2C register
 
-        data = self.read_reg(reg)
+        Registers 0x02 to 0x07 are updated from the shadow in a single write,
+        others are read from the device first. SEEK is not in the shadow, so
+        it is written back set while a seek runs; clearing it would abort
+        the seek."""
+
+        if SHADOW_FIRST_REG <= reg <= SHADOW_LAST_REG:
+            data = self.shadow_reg(reg)
+            self.reads_saved += 1
+        else:
+            data = self.read_reg(reg)
         data = (data & ~mask) | value
+        if reg == RDA5807M_REG_CONFIG and self.seeking and not mask & RDA5807M_FLG_SEEK:
+            data |= RDA5807M_FLG_SEEK
         self.write_reg(reg, data)
 
+    def resync(self):
+
+        """ Reload the shadow from the device, e.g. after a brown-out or if
+        something else wrote to it """
+
+        for reg in range(SHADOW_FIRST_REG, SHADOW_LAST_REG + 1):
+            self.shadow[reg - SHADOW_FIRST_REG] = self.read_reg(reg) & ~SELF_CLEARING.get(reg, 0)
+
     def set_volume(self, volume):
 
         """ Set volume 0 to 15 """
@@ -217,7 +351,7 @@ class Radio:
 
         """ Get Volume 0 to 15 """
 
-        return self.read_reg(RDA5807M_REG_VOLUME) & 0xf #bits 3:0
+        return self.shadow_reg(RDA5807M_REG_VOLUME) & 0xf #bits 3:0
 
     def mute(self, mute):
 
@@ -249,151 +383,276 @@ class Radio:
           self.update_reg(RDA5807M_REG_CONFIG, RDA5807M_FLG_MONO, 0)
         self.mono_flag = mono
 
-    def seek_up(self):
+    def start_seek(self, up=True, callback=None):
 
-        """ Find next station (blocks until tuning completes) """
+        """ Start seeking for the next (up=True) or previous station and
+        return straight away
+
+        STC is polled every SEEK_POLL_MS from a timer. When the seek
+        completes, callback(frequency_MHz, rssi) is called from the timer
+        callback; rssi is as from get_signal_strength(), 0 if no station
+        was found. A seek still running after SEEK_TIMEOUT_MS is stopped
+        where the chip got to, as if no station was found."""
+
+        self.cancel_seek()
+        self._begin_seek(up)
+        self._seek_callback = callback
+        self._seek_timer.init(
+            mode=Timer.PERIODIC,
+            period=SEEK_POLL_MS,
+            callback=self._seek_poll
+        )
+
+    def cancel_seek(self):
+
+        """ Stop a seek started with start_seek(), staying where the chip got to
+
+        Returns the frequency in MHz the chip stopped at, or None if no seek
+        was running. """
+
+        if not self.seeking:
+            return None
+
+        self._seek_timer.deinit()
+        self.seeking = False
+        self._seek_callback = None
+        self.update_reg(RDA5807M_REG_CONFIG, RDA5807M_FLG_SEEK, 0)
+
+        self.read_status()
+        return self._track_channel(self.status_reg(RDA5807M_REG_STATUS) & 0x3ff)
 
+    def _track_channel(self, channel):
+        # keep the shadowed channel in step with where a seek ended, and
+        # return its frequency
+        self.shadow[RDA5807M_REG_TUNING - SHADOW_FIRST_REG] = (
+            (channel << 6) | (self.shadow_reg(RDA5807M_REG_TUNING) & 0x3f))
+        return self.start_frequency_MHz + channel * self.frequency_spacing_MHz
+
+    def _begin_seek(self, up):
         self.clear_rds_data()
         self.update_reg(RDA5807M_REG_CONFIG,
             (RDA5807M_FLG_SEEKUP | RDA5807M_FLG_SEEK),
-            (RDA5807M_FLG_SEEKUP | RDA5807M_FLG_SEEK))
-        while 1:
-            data = self.read_reg(RDA5807M_REG_CONFIG)
-            if not data & RDA5807M_FLG_SEEK:
-                break
+            (RDA5807M_FLG_SEEKUP if up else 0) | RDA5807M_FLG_SEEK)
+        self.seeking = True
+        self._seek_start = utime.ticks_ms()
+
+    def _seek_poll(self, timer):
+        self.read_status()
+        status = self.status_reg(RDA5807M_REG_STATUS)
+        timed_out = False
+        if not status & RDA5807M_FLG_STC:
+            if utime.ticks_diff(utime.ticks_ms(), self._seek_start) < SEEK_TIMEOUT_MS:
+                return
+            timed_out = True
+
+        self._seek_timer.deinit()
+        self.seeking = False
+        if timed_out:
+            self.update_reg(RDA5807M_REG_CONFIG, RDA5807M_FLG_SEEK, 0)
+
+        frequency = self._track_channel(status & 0x3ff)
+        rssi = 0
+        if not timed_out and not status & RDA5807M_FLG_SF:
+            rssi = round(7*(self.status_reg(RDA5807M_REG_RSSI) >> 9)/127)
+
+        callback = self._seek_callback
+        self._seek_callback = None
+        if callback:
+            callback(frequency, rssi)
+
+    def seek_up(self):
+
+        """ Find next station (blocks until tuning completes) """
+
+        self._begin_seek(True)
+        while self.seeking:
+            utime.sleep_ms(SEEK_POLL_MS)
+            self._seek_poll(None)
 
     def seek_down(self):
 
         """ Find previous station (blocks until tuning completes) """
 
-        self.clear_rds_data()
-        self.update_reg(RDA5807M_REG_CONFIG,
-            (RDA5807M_FLG_SEEKUP | RDA5807M_FLG_SEEK),
-            RDA5807M_FLG_SEEK)
-        while 1:
-            data = self.read_reg(RDA5807M_REG_CONFIG)
-            if not data & RDA5807M_FLG_SEEK:
-                break
+        self._begin_seek(False)
+        while self.seeking:
+            utime.sleep_ms(SEEK_POLL_MS)
+            self._seek_poll(None)
 
     def get_frequency_MHz(self):
 
         """ Get tuned frequency in MHz """
 
-        frequency = self.start_frequency_MHz + ((self.read_reg(RDA5807M_REG_STATUS) & 0x3ff) * self.frequency_spacing_MHz)
+        self.read_status()
+        frequency = self.start_frequency_MHz + ((self.status_reg(RDA5807M_REG_STATUS) & 0x3ff) * self.frequency_spacing_MHz)
         return frequency
 
     def set_frequency_MHz(self, frequency_MHz):
 
         """ Set tuned frequency in MHz """
 
+        self.set_channel(round((frequency_MHz - self.start_frequency_MHz)/self.frequency_spacing_MHz))
+
+    def set_channel(self, channel):
+
+        """ Tune to a channel number, counted in frequency spacing steps from
+        the bottom of the band. STC is set when tuning completes. """
+
         self.clear_rds_data()
-        frequency_steps = int((frequency_MHz - self.start_frequency_MHz)/self.frequency_spacing_MHz)
-        data = (frequency_steps << 6) | 0x10
+        data = (channel << 6) | (self.shadow_reg(RDA5807M_REG_TUNING) & 0x3f) | RDA5807M_FLG_TUNE
         self.write_reg(RDA5807M_REG_TUNING, data)
 
+    def get_channel(self):
+
+        """ Channel last tuned to with set_channel() or a seek """
+
+        return self.shadow_reg(RDA5807M_REG_TUNING) >> 6
+
     def get_signal_strength(self):
 
         """ Recieved Signal Strength Indicator 0 = low, 7 = high (logarithmic)"""
 
-        rssi = round(7*(self.read_reg(RDA5807M_REG_RSSI) >> 9)/127)
+        self.read_status()
+        rssi = round(7*(self.status_reg(RDA5807M_REG_RSSI) >> 9)/127)
         return rssi
 
     def get_rds_block_group(self):
 
         """ Read all 4 RDS blocks from device """
 
-        return self.read_reg(RDA5807M_REG_RDSA), self.read_reg(RDA5807M_REG_RDSB), self.read_reg(RDA5807M_REG_RDSC), self.read_reg(RDA5807M_REG_RDSD)
+        self.read_status()
+        return (
+            self.status_reg(RDA5807M_REG_RDSA), self.status_reg(RDA5807M_REG_RDSB),
+            self.status_reg(RDA5807M_REG_RDSC), self.status_reg(RDA5807M_REG_RDSD)
+        )
 
     def update_rds(self):
 
-        """ Check for new RDS messages and decode if present
-
-        Should be polled regularly so that we don't miss any.
-        Returns true if new data received.
-
-        .station_name, .radio_text contain decoded data.
-
-        machine RTC is updated upon reception of time/date messages"""
-
-        if (self.read_reg(RDA5807M_REG_STATUS) & 0x8000):
-
-            #check for uncorrectable errors
-            if (self.read_reg(RDA5807M_REG_RSSI) & 0x3) == 0x3:
-                return False
-            if (self.read_reg(RDA5807M_REG_RSSI) & 0xc) == 0xc:
-                return False
-
-            a, b, c, d = self.get_rds_block_group()
-
-            program_information = a
-            group_type = b >> 12
-            group_version = (b >> 11) & 1
-            traffic_program = (b >> 10) & 1
-            program_type = (b >> 5) & 0x1f
-
-            #station name
-            if group_type == 0:
-                offset = b & 0x3
-                character_a = chr(d >> 8)
-                character_b = chr(d & 0xff)
-
-                #Check multiple messages for consistency
-                self.station_name_buffer[offset*2] = character_a
-                self.station_name_buffer[(offset*2)+1] = character_b
-                if offset < self.last_st_offset:
-                    self.station_name = self.station_name_buffer
-                self.last_st_offset = offset
-
-            #radio text
-            elif group_type == 2 and group_version == 0:
-                offset = b & 0xf
-
-                ab = (b >> 4) & 1
-                character_a = c >> 8
-                character_b = c & 0xff
-                character_c = d >> 8
-                character_d = d & 0xff
-                if ab != self.last_ab:
-                    self.clear_buffer = True
-                    self.radio_text_buffer = [" " for i in range(64)]
-                self.last_ab = ab
-                self.radio_text_buffer[offset*4] = chr(character_a)
-                self.radio_text_buffer[(offset*4)+1] = chr(character_b)
-                self.radio_text_buffer[(offset*4)+2] = chr(character_c)
-                self.radio_text_buffer[(offset*4)+3] = chr(character_d)
-
-                if offset < self.last_offset:
-                    self.radio_text = self.radio_text_buffer
-                self.last_offset = offset
-
-            #radio text type 2
-            elif group_type == 2 and group_version == 1:
-                offset = b & 0xf
-                ab = (b >> 4) & 1
-                character_c = d >> 8
-                character_d = d & 0xff
-                if ab != self.last_ab:
-                    self.radio_text_buffer = [" " for i in range(64)]
-                self.radio_text_buffer[(offset*2)+0] = chr(character_c)
-                self.radio_text_buffer[(offset*2)+1] = chr(character_d)
-
-                if offset < self.last_offset:
-                    self.radio_text = self.radio_text_buffer
-                self.last_offset = offset
-
-            elif group_type == 4 and group_version == 0:
-                hours_utc = ((c & 1) << 4) | ((d & 0xf000) >> 12)
-                minutes = ((d & 0xfc0) >> 6)
-                utc_offset = (d & 0x1f) * 0.25
-                utc_sign = d & 0x20
-
-                if utc_sign:
-                    hours = hours_utc + utc_offset
-                else:
-                    hours = hours_utc - utc_offset
-                try:
-                    self.rtc.datetime((2000, 1, 1, 1, int(hours), int(minutes), 0, 0))
-                except OSError:
-                    pass
-
-        return True
\ No newline at end of file
+        """ Check for a new RDS group and decode it if present
+
+        Should be polled regularly so that we don't miss any. Returns True if
+        a group was decoded. Does not allocate, except when a clock time
+        group sets the RTC (once a minute).
+
+        .station_name and .radio_text hold the last complete name and text as
+        bytearrays, see get_station_name() and get_radio_text().
+        .program_id, .program_type, .traffic_program and
+        .traffic_announcement are updated from every group.
+
+        The machine RTC is set to UTC upon reception of clock time groups."""
+
+        self.read_status()
+        if not self.status_reg(RDA5807M_REG_STATUS) & 0x8000:
+            return False
+
+        #check for uncorrectable errors
+        rssi = self.status_reg(RDA5807M_REG_RSSI)
+        if (rssi & 0x3) == 0x3 or (rssi & 0xc) == 0xc:
+            self.rds_errors += 1
+            return False
+
+        b = self.status_reg(RDA5807M_REG_RDSB)
+        self.program_id = self.status_reg(RDA5807M_REG_RDSA)
+        self.traffic_program = bool(b & 0x400)
+        self.program_type = (b >> 5) & 0x1f
+        self.rds_groups += 1
+
+        handler = self._group_handlers[b >> 12]
+        if handler is not None:
+            handler(b, self.status_reg(RDA5807M_REG_RDSC), self.status_reg(RDA5807M_REG_RDSD))
+        return True
+
+    def _rds_group_0(self, b, c, d):
+        #station name, 0A and 0B
+        self.traffic_announcement = bool(b & 0x10)
+
+        offset = b & 0x3
+        self.station_name_buffer[offset*2] = _rds_char(d >> 8)
+        self.station_name_buffer[(offset*2)+1] = _rds_char(d & 0xff)
+
+        #publish once all four segments came round
+        if offset < self.last_st_offset:
+            _copy(self.station_name, self.station_name_buffer)
+            self.station_name_received = True
+        self.last_st_offset = offset
+
+    def _rds_group_2(self, b, c, d):
+        #radio text, 2A carries 4 characters per group and 2B 2
+        offset = b & 0xf
+        ab = (b >> 4) & 1
+        if ab != self.last_ab:
+            _fill(self.radio_text_buffer, 0x20)
+        self.last_ab = ab
+
+        text = self.radio_text_buffer
+        if b & 0x800:
+            text[offset*2] = _rds_char(d >> 8)
+            text[(offset*2)+1] = _rds_char(d & 0xff)
+        else:
+            text[offset*4] = _rds_char(c >> 8)
+            text[(offset*4)+1] = _rds_char(c & 0xff)
+            text[(offset*4)+2] = _rds_char(d >> 8)
+            text[(offset*4)+3] = _rds_char(d & 0xff)
+
+        if offset < self.last_offset:
+            _copy(self.radio_text, text)
+            self.radio_text_received = True
+        self.last_offset = offset
+
+    def _rds_group_4(self, b, c, d):
+        #clock time and date, 4A only
+        if b & 0x800:
+            return
+
+        mjd = ((b & 0x3) << 15) | (c >> 1)
+        hour = ((c & 1) << 4) | (d >> 12)
+        minute = (d >> 6) & 0x3f
+        if hour > 23 or minute > 59 or mjd < _MJD_UNIX_EPOCH:
+            return
+
+        self.ct_year, self.ct_month, self.ct_day, self.ct_weekday = mjd_to_date(mjd)
+        self.hours = hour
+        self.minutes = minute
+        self.ct_offset = -(d & 0x1f) if d & 0x20 else d & 0x1f
+        self.ct_received = True
+
+        try:
+            self.rtc.datetime((self.ct_year, self.ct_month, self.ct_day, self.ct_weekday, hour, minute, 0, 0))
+        except OSError:
+            pass
+
+    def get_station_name(self):
+
+        """ Last complete RDS station name, "" if none received yet """
+
+        if not self.station_name_received:
+            return ""
+        return bytes(self.station_name).decode().strip()
+
+    def get_radio_text(self):
+
+        """ Last complete RDS radio text, "" if none received yet """
+
+        if not self.radio_text_received:
+            return ""
+        return bytes(self.radio_text).decode().strip()
+
+    def get_program_type(self):
+
+        """ Programme type name (European RDS table) """
+
+        return rds_program_types_europe[self.program_type]
+
+
+def _fill(buf, value):
+    for i in range(len(buf)):
+        buf[i] = value
+
+
+def _copy(dest, src):
+    for i in range(len(dest)):
+        dest[i] = src[i]
+
+
+def _rds_char(code):
+    # The RDS character set matches ASCII for printable characters only
+    return code if 0x20 <= code < 0x7f else 0x3f
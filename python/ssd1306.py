@@ -24,9 +24,17 @@ SET_PRECHARGE = const(0xD9)
 SET_VCOM_DESEL = const(0xDB)
 SET_CHARGE_PUMP = const(0x8D)
 
+# size of the page/column preamble sent before each page of data
+_PAGE_CMD_BYTES = const(3)
+# preallocated command batch size for SSD1306_SPI
+_CMD_BUF_SIZE = const(32)
+
 # Subclassing FrameBuffer provides support for graphics primitives
 # http://docs.micropython.org/en/latest/pyboard/library/framebuf.html
 class SSD1306(framebuf.FrameBuffer):
+    # bus transactions used by write_page(), for the show() counters
+    _page_transactions = 4
+
     def __init__(self, width, height, external_vcc):
         self.width = width
         self.height = height
@@ -34,10 +42,33 @@ class SSD1306(framebuf.FrameBuffer):
         self.pages = self.height // 8
         self.buffer = bytearray(self.pages * self.width)
         super().__init__(self.buffer, self.width, self.height, framebuf.MONO_VLSB)
+
+        # Shadow copy of what the panel currently holds, one bytearray per
+        # page, so show() only sends the pages that changed since last flush.
+        buf = memoryview(self.buffer)
+        self._frame_view = buf
+        self._page_views = [
+            buf[p * self.width:(p + 1) * self.width] for p in range(self.pages)
+        ]
+        self._shadow = [bytearray(self.width) for _ in range(self.pages)]
+        self._force_flush = True
+        self._page_cmd = bytearray((0xB0, 0x02, 0x10))
+
+        # Front buffer for double-buffered use, see present()/flush_step().
+        self._front = None
+        self._front_views = None
+        self._front_force = False
+        self._flush_cursor = 0
+        self.frame_pending = False
+        self.frames_coalesced = 0
+
+        self.bytes_saved = 0
+        self.transactions_saved = 0
+
         self.init_display()
 
     def init_display(self):
-        for cmd in (
+        self.write_cmds((
             SET_DISP,  # display off
             # address setting
             SET_MEM_ADDR,
@@ -70,8 +101,7 @@ class SSD1306(framebuf.FrameBuffer):
             SET_CHARGE_PUMP,
             0x10 if self.external_vcc else 0x14,
             SET_DISP | 0x01,  # display on
-        ):  # on
-            self.write_cmd(cmd)
+        ))
         self.fill(0)
         self.show()
 
@@ -80,32 +110,135 @@ class SSD1306(framebuf.FrameBuffer):
 
     def poweron(self):
         self.write_cmd(SET_DISP | 0x01)
+        self.invalidate()
 
     def contrast(self, contrast):
-        self.write_cmd(SET_CONTRAST)
-        self.write_cmd(contrast)
+        self.write_cmds((SET_CONTRAST, contrast))
 
     def invert(self, invert):
         self.write_cmd(SET_NORM_INV | (invert & 1))
 
     def rotate(self, rotate):
-        self.write_cmd(SET_COM_OUT_DIR | ((rotate & 1) << 3))
-        self.write_cmd(SET_SEG_REMAP | (rotate & 1))
+        self.write_cmds((
+            SET_COM_OUT_DIR | ((rotate & 1) << 3),
+            SET_SEG_REMAP | (rotate & 1),
+        ))
+
+    def invalidate(self):
+        """
+        Mark every page as dirty so the next show() resends the whole frame,
+        e.g. after the panel lost its RAM contents.
+        """
+        self._force_flush = True
 
     def show(self):
-        for Page in range( 0, 8 ):
-            self.write_cmd( 0xB0 | ( Page & 0x0F ))
-            self.write_cmd( 0x02 )
-            self.write_cmd( 0x10 )
-            self.write_data( self.buffer[Page<<7:(Page<<7)+128] )
+        """
+        Send the pages of the frame buffer that differ from what was last
+        flushed to the panel. Skipped pages are added to `bytes_saved` and
+        `transactions_saved`.
+        """
+        force = self._force_flush
+        self._force_flush = False
+
+        for page in range(self.pages):
+            self._flush_page(page, self._page_views[page], force)
+
+    def present(self):
+        """
+        Snapshot the frame buffer into the front buffer to be sent with
+        flush_step(), leaving the frame buffer free for the next frame.
+        Presenting again before the flush finished replaces the pending frame
+        and counts it in `frames_coalesced`.
+        """
+        if self._front is None:
+            self._front = bytearray(len(self.buffer))
+            front = memoryview(self._front)
+            self._front_views = [
+                front[p * self.width:(p + 1) * self.width]
+                for p in range(self.pages)
+            ]
+
+        if self.frame_pending:
+            self.frames_coalesced += 1
+            self._front_force = self._front_force or self._force_flush
+        else:
+            self._front_force = self._force_flush
+        self._force_flush = False
+
+        self._front[:] = self.buffer
+        self._flush_cursor = 0
+        self.frame_pending = True
+
+    def flush_step(self):
+        """
+        Send the next dirty page of the presented frame, skipping pages that
+        are already up to date. Returns True while the frame is still pending.
+        """
+        while self.frame_pending:
+            page = self._flush_cursor
+            self._flush_cursor += 1
+
+            if self._flush_cursor >= self.pages:
+                self.frame_pending = False
+
+            if self._flush_page(page, self._front_views[page], self._front_force):
+                break
+
+        return self.frame_pending
+
+    def _flush_page(self, page, view, force):
+        shadow = self._shadow[page]
+
+        if not force and shadow == view:
+            self.bytes_saved += _PAGE_CMD_BYTES + self.width
+            self.transactions_saved += self._page_transactions
+            return False
+
+        self.write_page(page, view)
+        shadow[:] = view
+        return True
+
+    def write_cmds(self, cmds):
+        """
+        Send a sequence of command bytes. Interfaces that support it override
+        this to send the whole sequence in a single bus transaction.
+
+        cmds(iterable): Command bytes to send, in order.
+        """
+        for cmd in cmds:
+            self.write_cmd(cmd)
+
+    def write_page(self, page, buf):
+        """
+        Address `page` (starting at column 2) and send `buf` as its contents.
+        """
+        self._page_cmd[0] = 0xB0 | (page & 0x0F)
+        self.write_cmds(self._page_cmd)
+        self.write_data(buf)
 
 
 class SSD1306_I2C(SSD1306):
-    def __init__(self, width, height, i2c, addr=0x3C, external_vcc=False):
+    """
+    SSD1306 on an I2C bus. By default frames are written a page at a time
+    from column 2, like the SPI driver, which suits the SH1106-style panels
+    this clock uses. With `horizontal` set, frames are written using
+    horizontal addressing instead: show() sets the column/page window once
+    and streams the whole dirty page range in a single write. Only true
+    SSD1306 panels support this; it starts at column 0.
+    """
+    # write_page() sends one command and one data transaction
+    _page_transactions = 2
+
+    def __init__(self, width, height, i2c, addr=0x3C, external_vcc=False, horizontal=False):
         self.i2c = i2c
         self.addr = addr
+        self.horizontal = horizontal
         self.temp = bytearray(2)
         self.write_list = [b"\x40", None]  # Co=0, D/C#=1
+        self.cmd_list = [b"\x00", None]  # Co=0, D/C#=0
+        self._window = bytearray(
+            (SET_COL_ADDR, 0, width - 1, SET_PAGE_ADDR, 0, height // 8 - 1)
+        )
         super().__init__(width, height, external_vcc)
 
     def write_cmd(self, cmd):
@@ -113,19 +246,72 @@ class SSD1306_I2C(SSD1306):
         self.temp[1] = cmd
         self.i2c.writeto(self.addr, self.temp)
 
+    def write_cmds(self, cmds):
+        """
+        Send a sequence of command bytes as one command stream write.
+
+        cmds(sequence): Command bytes to send, in order.
+        """
+        if not isinstance(cmds, (bytes, bytearray, memoryview)):
+            cmds = bytes(cmds)
+
+        self.cmd_list[1] = cmds
+        self.i2c.writevto(self.addr, self.cmd_list)
+
     def write_data(self, buf):
-        Page = 0
-        
-        for Page in range( 0, 8 ):
-            self.i2c.writeto_mem( 0x3C, 0x80, ( 0xB0 | ( Page & 0x0F ) ).to_bytes(1, 0 ))
-            self.i2c.writeto_mem( 0x3C, 0x80, b'\x02' )
-            self.i2c.writeto_mem( 0x3C, 0x80, b'\x10' )
-            buf1 = buf[Page<<7:(Page<<7)+128]
-            self.write_list[1] = buf1
-            
-            self.i2c.writevto( 0x3C, self.write_list )
+        self.write_list[1] = buf
+        self.i2c.writevto(self.addr, self.write_list)
+
+    def write_page(self, page, buf):
+        if not self.horizontal:
+            super().write_page(page, buf)
+            return
+
+        self._window[4] = page
+        self._window[5] = page
+        self.write_cmds(self._window)
+        self.write_data(buf)
+
+    def show(self):
+        """
+        Send the frame buffer to the panel. In horizontal mode, the pages
+        from the first to the last dirty one are sent as one burst straight
+        from the frame buffer, otherwise each dirty page is sent on its own.
+        """
+        if not self.horizontal:
+            super().show()
+            return
+
+        force = self._force_flush
+        self._force_flush = False
+
+        first = -1
+        last = -1
+        for page in range(self.pages):
+            if force or self._shadow[page] != self._page_views[page]:
+                if first < 0:
+                    first = page
+                last = page
+
+        skipped = self.pages - (last - first + 1) if first >= 0 else self.pages
+        self.bytes_saved += skipped * (_PAGE_CMD_BYTES + self.width)
+        self.transactions_saved += skipped * self._page_transactions
+
+        if first < 0:
+            return
+
+        self._window[4] = first
+        self._window[5] = last
+        self.write_cmds(self._window)
+        self.write_data(self._frame_view[first * self.width:(last + 1) * self.width])
+
+        for page in range(first, last + 1):
+            self._shadow[page][:] = self._page_views[page]
 
 class SSD1306_SPI(SSD1306):
+    # write_page() sends preamble and data under a single CS assertion
+    _page_transactions = 1
+
     def __init__(self, width, height, spi, dc, res, cs, external_vcc=False):
         self.rate = 10 * 1024 * 1024
         dc.init(dc.OUT, value=0)
@@ -135,6 +321,15 @@ class SSD1306_SPI(SSD1306):
         self.dc = dc
         self.res = res
         self.cs = cs
+
+        # The bus is dedicated to the display, so configure it once here
+        # rather than before every transfer.
+        self.spi.init(baudrate=self.rate, polarity=0, phase=0)
+
+        self._cmd_buf = bytearray(_CMD_BUF_SIZE)
+        cmd_view = memoryview(self._cmd_buf)
+        self._cmd_views = [cmd_view[:n] for n in range(_CMD_BUF_SIZE + 1)]
+
         import time
 
         self.res(1)
@@ -145,18 +340,56 @@ class SSD1306_SPI(SSD1306):
         super().__init__(width, height, external_vcc)
 
     def write_cmd(self, cmd):
-        self.spi.init(baudrate=self.rate, polarity=0, phase=0)
+        self._cmd_buf[0] = cmd
         self.cs(1)
         self.dc(0)
         self.cs(0)
-        self.spi.write(bytearray([cmd]))
+        self.spi.write(self._cmd_views[1])
+        self.cs(1)
+
+    def write_cmds(self, cmds):
+        """
+        Send a sequence of command bytes under one CS assertion, staged in a
+        preallocated buffer. Sequences longer than the buffer are split.
+
+        cmds(sequence): Command bytes to send, in order.
+        """
+        buf = self._cmd_buf
+        total = len(cmds)
+        start = 0
+
+        self.cs(1)
+        self.dc(0)
+        self.cs(0)
+        while start < total:
+            n = min(total - start, _CMD_BUF_SIZE)
+            for i in range(n):
+                buf[i] = cmds[start + i]
+            self.spi.write(self._cmd_views[n])
+            start += n
         self.cs(1)
 
     def write_data(self, buf):
-        self.spi.init(baudrate=self.rate, polarity=0, phase=0)
         self.cs(1)
         self.dc(1)
         self.cs(0)
         self.spi.write(buf)
         self.cs(1)
-            
\ No newline at end of file
+
+    def write_page(self, page, buf):
+        """
+        Send the page/column preamble and the page data in one transaction,
+        switching D/C between the two.
+        """
+        cmd = self._cmd_buf
+        cmd[0] = 0xB0 | (page & 0x0F)
+        cmd[1] = 0x02
+        cmd[2] = 0x10
+
+        self.cs(1)
+        self.dc(0)
+        self.cs(0)
+        self.spi.write(self._cmd_views[_PAGE_CMD_BYTES])
+        self.dc(1)
+        self.spi.write(buf)
+        self.cs(1)
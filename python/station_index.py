@@ -0,0 +1,290 @@
+import struct
+import utime
+
+from machine import Timer
+
+import rda5807
+
+
+FIRST_MHZ = 87.5
+LAST_MHZ = 108.0
+SPACING_MHZ = 0.1
+NUM_CHANNELS = int(round((LAST_MHZ - FIRST_MHZ) / SPACING_MHZ)) + 1
+NAME_LENGTH = 8 # RDS programme service name
+
+# File layout: magic, version, station count, then per station its channel,
+# RSSI and name.
+_HEADER_FORMAT = "<2sBB"
+_STATION_FORMAT = "<BB8s"
+_MAGIC = b"SI"
+_VERSION = 1
+
+_POLL_MS = 40
+_MIN_RSSI = 20 # 0 to 127, as in the RSSI register
+_RDS_DWELL_MS = 1500
+
+_TUNING = 0
+_LISTENING = 1
+
+
+def channel(freq):
+    """
+    Return the index channel nearest a frequency in MHz, clamped to the band.
+    """
+    return max(min(int(round((freq - FIRST_MHZ) / SPACING_MHZ)), NUM_CHANNELS - 1), 0)
+
+
+def frequency(channel):
+    return round((FIRST_MHZ + channel * SPACING_MHZ) * 10) / 10
+
+
+class StationIndex(object):
+    """
+    Stations found by a band scan, in frequency order, kept in flat arrays:
+    `channels` (see channel()), `rssi` (0 to 127) and `names`, NAME_LENGTH
+    bytes per station padded with spaces.
+
+    A per-channel table holds the first station at or above each channel,
+    so stepping to the next or previous station from any frequency is a
+    single lookup.
+
+    max_stations(int): Capacity, at most 255.
+    """
+    def __init__(self, max_stations=64):
+        self.max_stations = min(max_stations, 255)
+        self.count = 0
+        self.channels = bytearray(self.max_stations)
+        self.rssi = bytearray(self.max_stations)
+        self.names = bytearray(NAME_LENGTH * self.max_stations)
+        self._slots = bytearray(NUM_CHANNELS)
+
+    def clear(self):
+        self.count = 0
+        self.rebuild()
+
+    def add(self, channel, rssi, name=b""):
+        """
+        Append a station. Stations must be added in increasing channel
+        order, as a scan finds them, and rebuild() called after the last
+        one. Returns False if the index is full.
+        """
+        if self.count >= self.max_stations:
+            return False
+
+        self._store(channel, rssi, name)
+        return True
+
+    def _store(self, channel, rssi, name):
+        n = self.count
+        self.channels[n] = channel
+        self.rssi[n] = min(rssi, 255)
+        offset = NAME_LENGTH * n
+        for i in range(NAME_LENGTH):
+            c = name[i] if i < len(name) else 0x20
+            self.names[offset + i] = c if 0x20 <= c < 0x7f else 0x3f # printable ASCII or "?"
+        self.count += 1
+
+    def rebuild(self):
+        """
+        Rebuild the per-channel table used by find() and step().
+        """
+        station = 0
+        for ch in range(NUM_CHANNELS):
+            while station < self.count and self.channels[station] < ch:
+                station += 1
+            self._slots[ch] = station
+
+    def find(self, freq):
+        """
+        Return the index of the station at freq (MHz), or -1.
+        """
+        ch = channel(freq)
+        station = self._slots[ch]
+        if station < self.count and self.channels[station] == ch:
+            return station
+        return -1
+
+    def step(self, freq, direction):
+        """
+        Return the frequency of the next (direction > 0) or previous station
+        from freq, wrapping around the band, or None if the index is empty.
+        """
+        if not self.count:
+            return None
+
+        ch = channel(freq)
+        station = self._slots[ch]
+        if direction > 0:
+            if station < self.count and self.channels[station] == ch:
+                station += 1
+        else:
+            station -= 1
+
+        return frequency(self.channels[station % self.count])
+
+    def frequency(self, station):
+        return frequency(self.channels[station])
+
+    def name(self, station):
+        """
+        Return the RDS name of a station as a string, "" if none was received.
+        """
+        offset = NAME_LENGTH * station
+        return bytes(self.names[offset:offset + NAME_LENGTH]).decode().strip()
+
+    def save(self, path="stations.bin"):
+        with open(path, "wb") as f:
+            f.write(struct.pack(_HEADER_FORMAT, _MAGIC, _VERSION, self.count))
+            record = bytearray(struct.calcsize(_STATION_FORMAT))
+            for n in range(self.count):
+                offset = NAME_LENGTH * n
+                struct.pack_into(
+                    _STATION_FORMAT, record, 0, self.channels[n], self.rssi[n],
+                    bytes(self.names[offset:offset + NAME_LENGTH])
+                )
+                f.write(record)
+
+    def load(self, path="stations.bin"):
+        """
+        Replace the index with the one saved at path. Returns False, leaving
+        the index empty, if there is no valid file.
+        """
+        self.clear()
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return False
+
+        header_size = struct.calcsize(_HEADER_FORMAT)
+        station_size = struct.calcsize(_STATION_FORMAT)
+        if len(data) < header_size:
+            return False
+
+        magic, version, count = struct.unpack_from(_HEADER_FORMAT, data, 0)
+        if magic != _MAGIC or version != _VERSION or len(data) < header_size + count * station_size:
+            return False
+
+        for n in range(min(count, self.max_stations)):
+            ch, rssi, name = struct.unpack_from(_STATION_FORMAT, data, header_size + n * station_size)
+            self._store(ch, rssi, name)
+        self.rebuild()
+        return True
+
+
+class BandScan(object):
+    """
+    Scans the band one channel at a time from a timer, so the UI keeps
+    running. Each channel is tuned and, once the chip reports the tune
+    complete (STC), kept if it is a real station (FM_TRUE) at or above
+    `min_rssi`. The scan then listens for up to `dwell_ms` for the RDS
+    station name before moving on.
+
+    When the scan ends the radio is returned to the channel and mute state
+    it had, and callback() is called. The index is not written to flash
+    from the timer: save() does that once `save_pending` is set, from the
+    main loop.
+
+    radio(rda5807.Radio): Radio to scan with.
+    index(StationIndex): Cleared and filled by the scan.
+    """
+    def __init__(self, radio, index, callback=None, min_rssi=_MIN_RSSI, dwell_ms=_RDS_DWELL_MS):
+        self.radio = radio
+        self.index = index
+        self.callback = callback
+        self.min_rssi = min_rssi
+        self.dwell_ms = dwell_ms
+
+        self.running = False
+        self.save_pending = False
+        self.channel = 0
+        self._state = _TUNING
+        self._listen_start = 0
+        self._rssi = 0
+        self._restore_channel = 0
+        self._restore_mute = True
+        self._timer = Timer()
+
+        # Index channels in the radio's own channel numbering
+        self._offset = int(round((FIRST_MHZ - radio.start_frequency_MHz) / radio.frequency_spacing_MHz))
+
+    def start(self):
+        if self.running:
+            return
+
+        self._restore_channel = self.radio.get_channel()
+        self._restore_mute = self.radio.mute_flag
+        self.radio.cancel_seek()
+        self.radio.mute(True)
+
+        self.index.clear()
+        self.running = True
+        self._tune(0)
+        self._timer.init(mode=Timer.PERIODIC, period=_POLL_MS, callback=self._poll)
+
+    def cancel(self):
+        """
+        Stop the scan, keeping the stations found so far.
+        """
+        if self.running:
+            self._finish()
+
+    def _tune(self, channel):
+        self.channel = channel
+        self._state = _TUNING
+        self.radio.set_channel(self._offset + channel)
+
+    def _poll(self, timer):
+        if self._state == _TUNING:
+            self.radio.read_status()
+            if not self.radio.status_reg(rda5807.RDA5807M_REG_STATUS) & rda5807.RDA5807M_FLG_STC:
+                return
+
+            rssi_reg = self.radio.status_reg(rda5807.RDA5807M_REG_RSSI)
+            self._rssi = rssi_reg >> 9
+            if rssi_reg & rda5807.RDA5807M_FLG_FMTRUE and self._rssi >= self.min_rssi:
+                self._state = _LISTENING
+                self._listen_start = utime.ticks_ms()
+                return
+
+        else:
+            self.radio.update_rds()
+            received = self.radio.station_name_received
+            waited = utime.ticks_diff(utime.ticks_ms(), self._listen_start)
+            if not received and waited < self.dwell_ms:
+                return
+
+            self.index.add(self.channel, self._rssi, self.radio.station_name if received else b"")
+
+        if self.channel + 1 < NUM_CHANNELS:
+            self._tune(self.channel + 1)
+        else:
+            self._finish()
+
+    def save(self):
+        """
+        Write the index of a finished scan to flash, if not done yet.
+        Returns False if writing failed.
+        """
+        if not self.save_pending:
+            return True
+
+        self.save_pending = False
+        try:
+            self.index.save()
+        except OSError as e:
+            print("Saving stations failed:", e)
+            return False
+        return True
+
+    def _finish(self):
+        self._timer.deinit()
+        self.running = False
+        self.index.rebuild()
+        self.save_pending = True
+
+        self.radio.set_channel(self._restore_channel)
+        self.radio.mute(self._restore_mute)
+
+        if self.callback:
+            self.callback()